@@ -0,0 +1,225 @@
+import base64
+import json
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Final
+
+import typer
+
+from main import decode_mail_payload, parse_rh_message
+
+"""
+Throughput and startup benchmarks for the local (no network) parts of the reporting tools.
+
+Uses Typer, see 'benchmarks.py --help'
+"""
+
+app = typer.Typer(add_completion=False)
+
+# libraries that only the commands using them should import, never 'import main'
+HEAVY_MODULES: Final = ("pandas", "numpy", "pygsheets", "googleapiclient", "google_auth_oauthlib", "atlassian")
+RH_PARSE_HISTORY: Final = Path("benchmarks_rh_parse.jsonl")  # one line per saved rh-parse run
+
+
+def synthetic_rh_messages(count: int, seed: int = 0) -> list[dict]:
+    """Gmail API style RH messages, a mix of single part and multipart/alternative bodies."""
+    rng = random.Random(seed)
+    vendors = ("Lumen", "Equinix", "Digital Realty", "CoreSite", "Zayo Group")
+    times = ("1 hour", "2 hours", "1.5 hours", "1 hour 30 minutes", "3 hours 15 minutes")
+
+    def encode(text: str) -> str:
+        return base64.urlsafe_b64encode(text.encode()).decode().rstrip("=")
+
+    messages = []
+    for i in range(count):
+        body = (
+            "Remote Hands request completed.\n\n"
+            f"Vendor: {rng.choice(vendors)}\n"
+            f"Jira Ticket: NOC-{rng.randint(100000, 999999)}\n"
+            f"Charge: {rng.choice(('Yes', 'No Charge'))}\n"
+            f"Billable Time (hours): {rng.choice(times)}\n\n"
+            + "Technician notes: replaced optic and verified light levels.\n" * rng.randint(1, 20)
+        )
+        if i % 2:
+            payload = {"mimeType": "text/plain", "body": {"data": encode(body)}}
+        else:
+            payload = {
+                "mimeType": "multipart/alternative",
+                "body": {"size": 0},
+                "parts": [
+                    {"mimeType": "text/plain", "body": {"data": encode(body)}},
+                    {"mimeType": "text/html", "body": {"data": encode(f"<pre>{body}</pre>")}},
+                ],
+            }
+        messages.append({"id": str(i), "snippet": body[:100], "payload": payload})
+    return messages
+
+
+@app.command()
+def rh_parse(
+    count: int = typer.Option(100_000, help="Number of synthetic RH messages."),
+    rounds: int = typer.Option(3, help="Timed rounds, the best is reported."),
+    tolerance: float = typer.Option(0.1, help="Slowdown vs the previous saved run reported as a regression."),
+    save: bool = typer.Option(True, help=f"Append the result to {RH_PARSE_HISTORY}."),
+):
+    """Decode + parse throughput of the RH email parser, compared with the previous saved run of the same count.
+    Exits with 1 if a stage got slower than tolerance allows.
+    """
+    messages = synthetic_rh_messages(count)
+    bodies = [decode_mail_payload(i) for i in messages]
+    previous = _last_run(RH_PARSE_HISTORY, count)
+
+    result = {"date": datetime.now().isoformat(timespec="seconds"), "commit": _git_commit(), "count": count}
+    regressed = False
+    for name, func, corpus in (
+        ("decode", decode_mail_payload, messages),
+        ("parse", parse_rh_message, bodies),
+    ):
+        best = min(_timed(func, corpus) for _ in range(rounds))
+        result[name] = round(count / best)
+        line = f"{name:>8}: {count} messages in {best:.3f}s ({result[name]:,} msg/s)"
+        if previous and name in previous:
+            change = result[name] / previous[name] - 1
+            regressed |= change < -tolerance
+            line += f", {change:+.1%} vs {previous['commit'] or previous['date']}"
+        print(line)
+
+    if save:
+        with open(RH_PARSE_HISTORY, "a") as f:
+            f.write(json.dumps(result) + "\n")
+    if regressed:
+        print(f"slower than the previous run by more than {tolerance:.0%}")
+        raise typer.Exit(1)
+
+
+def synthetic_calendar_events(days: int, per_day: int, seed: int = 0) -> list[dict]:
+    """Calendar API style events, timed events in mixed UTC offsets plus some all-day events."""
+    rng = random.Random(seed)
+    offsets = ("-08:00", "-07:00", "Z", "+00:00")
+    titles = ("CENIC Maintenance: {} fiber splice", "{} router upgrade", "{}", "Circuit turn-up {}", "Vendor visit")
+
+    events, first = [], datetime(2024, 1, 1)
+    for day in range(days):
+        date = first + timedelta(days=day)
+        for _ in range(per_day):
+            ticket = f"{rng.choice(('NOC', 'COR', 'SYS'))}-{rng.randint(100000, 999999)}"
+            event = {
+                "summary": rng.choice(titles).format(ticket),
+                "creator": {"email": f"user{rng.randint(1, 30)}@cenic.org"},
+                "description": "Work window details." * rng.randint(0, 3),
+            }
+            if rng.random() < 0.1:
+                event["start"] = {"date": date.strftime("%Y-%m-%d")}
+                event["end"] = {"date": (date + timedelta(days=1)).strftime("%Y-%m-%d")}
+            else:
+                start = date + timedelta(minutes=15 * rng.randint(0, 90))
+                offset = rng.choice(offsets)
+                event["start"] = {"dateTime": start.strftime("%Y-%m-%dT%H:%M:%S") + offset}
+                event["end"] = {
+                    "dateTime": (start + timedelta(hours=rng.randint(1, 6))).strftime("%Y-%m-%dT%H:%M:%S") + offset
+                }
+            events.append(event)
+    return events
+
+
+@app.command()
+def weekly_events(
+    days: int = typer.Option(365, help="Days of synthetic events."),
+    per_day: int = typer.Option(40, help="Events per day."),
+    rounds: int = typer.Option(3, help="Timed rounds, the best is reported."),
+):
+    """Shaping of raw calendar events into weekly report rows (tools.shape_events/events_report)."""
+    import pandas as pd
+
+    from tools import EVENT_COLUMNS, events_report, shape_events
+
+    raw = pd.json_normalize(synthetic_calendar_events(days, per_day)).reindex(columns=EVENT_COLUMNS)
+    raw["calendar"] = "Maint. Cal"
+    tickets = shape_events(raw)["ticket"].dropna().unique()
+    ticket_data = pd.DataFrame(
+        {"assignee": "jdoe", "reporter": "asmith", "ticket_sum": "summary", "last_comment": "comment"},
+        index=tickets[::2],  # half the events have a ticket Jira knows about
+    )
+
+    for name, func in (
+        ("shape", lambda: shape_events(raw)),
+        ("report", lambda: events_report(shape_events(raw), ticket_data)),
+    ):
+        best = min(_timed(lambda _: func(), [None]) for _ in range(rounds))
+        print(f"{name:>8}: {len(raw)} events in {best:.3f}s ({len(raw) / best:,.0f} events/s)")
+
+
+@app.command()
+def import_time(
+    module: str = typer.Option("main", help="Module to import, i.e. what 'python main.py --help' pays for."),
+    rounds: int = typer.Option(5, help="Fresh interpreters to run, the best is reported."),
+    top: int = typer.Option(10, help="Number of slowest modules (self time) to list."),
+    budget_ms: float = typer.Option(0, help="Fail if the cumulative import time exceeds this, 0 to disable."),
+):
+    """Import time of a module, from 'python -X importtime' in a fresh interpreter.
+
+    Exits 1 if the import exceeds --budget-ms or loads any of HEAVY_MODULES.
+    """
+    best = min((_import_times(module) for _ in range(rounds)), key=lambda i: i[module][1])
+    total_ms = best[module][1] / 1000
+
+    print(f"import {module}: {total_ms:.1f}ms cumulative, {len(best)} modules")
+    for name, (self_us, _) in sorted(best.items(), key=lambda i: i[1][0], reverse=True)[:top]:
+        print(f"{self_us / 1000:>8.1f}ms  {name}")
+
+    heavy = sorted({i.split(".")[0] for i in best} & set(HEAVY_MODULES))
+    if heavy:
+        print(f"FAIL: heavy modules imported at startup: {', '.join(heavy)}")
+    if budget_ms and total_ms > budget_ms:
+        print(f"FAIL: {total_ms:.1f}ms exceeds the {budget_ms:.1f}ms budget")
+    if heavy or (budget_ms and total_ms > budget_ms):
+        raise typer.Exit(1)
+
+
+def _import_times(module: str) -> dict[str, tuple[int, int]]:
+    """Return {module: (self us, cumulative us)} for everything imported by 'import module'."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=Path(__file__).parent,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        # import time:       412 |       1337 |   typer.core
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def _last_run(history: Path, count: int) -> dict | None:
+    """Most recent saved result for the same corpus size."""
+    if not history.exists():
+        return None
+    with open(history, "r") as f:
+        runs = [run for line in f if line.strip() and (run := json.loads(line))["count"] == count]
+    return runs[-1] if runs else None
+
+
+def _git_commit() -> str:
+    """Short hash of HEAD, '' outside a git checkout."""
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True)
+    return result.stdout.strip()
+
+
+def _timed(func, corpus: list) -> float:
+    start = time.perf_counter()
+    for i in corpus:
+        func(i)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,126 @@
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime, time as dt_time
+from pathlib import Path
+from typing import Final, Iterable
+from zoneinfo import ZoneInfo
+
+"""
+SQLite store of Google Calendar events, kept current with Calendar sync tokens.
+
+GoogleTools.sync_calendar pulls only the events changed since the last sync and applies them here
+(cancelled events are deleted), so date range queries for reports are answered locally instead of
+re-listing the calendar. Start/end are stored as epoch times, all-day events start and end at
+midnight in the store's timezone.
+"""
+
+SCHEMA: Final = """
+CREATE TABLE IF NOT EXISTS events (
+    calendar TEXT NOT NULL,
+    id TEXT NOT NULL,
+    start REAL NOT NULL,
+    end REAL NOT NULL,
+    event TEXT NOT NULL,
+    PRIMARY KEY (calendar, id)
+);
+CREATE INDEX IF NOT EXISTS events_start ON events (calendar, start);
+CREATE TABLE IF NOT EXISTS sync (
+    calendar TEXT PRIMARY KEY,
+    token TEXT NOT NULL,
+    synced REAL NOT NULL
+);
+"""
+
+
+def parse_rfc3339(value: str) -> datetime:
+    """Calendar API timestamp, i.e. '2023-05-01T13:45:00-07:00' or '2023-05-01T20:45:00Z'."""
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+class EventStore:
+    def __init__(self, path: Path, tz: str):
+        self.path = path
+        self.tz = ZoneInfo(tz)
+
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+
+    def _epoch(self, when: dict) -> float:
+        """Epoch time of an event start/end, {'dateTime': ...} or {'date': ...} for all-day events."""
+        if "dateTime" in when:
+            return parse_rfc3339(when["dateTime"]).timestamp()
+        return datetime.combine(datetime.fromisoformat(when["date"]), dt_time(), self.tz).timestamp()
+
+    def sync_token(self, calendar: str) -> str | None:
+        with self.lock:
+            row = self.db.execute("SELECT token FROM sync WHERE calendar = ?", [calendar]).fetchone()
+        return row[0] if row else None
+
+    def apply(self, calendar: str, events: Iterable[dict]) -> tuple[int, int]:
+        """Upsert changed events and delete cancelled ones, returns (stored, deleted) counts."""
+        stored, deleted = [], []
+        for i in events:
+            if i.get("status") == "cancelled":
+                deleted.append((calendar, i["id"]))
+            else:
+                stored.append((calendar, i["id"], self._epoch(i["start"]), self._epoch(i["end"]), json.dumps(i)))
+
+        with self.lock, self.db:
+            self.db.executemany("INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?)", stored)
+            self.db.executemany("DELETE FROM events WHERE calendar = ? AND id = ?", deleted)
+        return len(stored), len(deleted)
+
+    def save_token(self, calendar: str, token: str) -> None:
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO sync VALUES (?, ?, ?)", [calendar, token, time.time()])
+
+    def reset(self, calendar: str) -> None:
+        """Forget a calendar's events and sync token, before a full sync."""
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM events WHERE calendar = ?", [calendar])
+            self.db.execute("DELETE FROM sync WHERE calendar = ?", [calendar])
+
+    def events(self, calendar: str, time_min: datetime, time_max: datetime, q: str = "") -> list[dict]:
+        """Events overlapping [time_min, time_max) ordered by start time, like events().list with
+        timeMin/timeMax. q filters on summary, case-insensitive.
+        """
+        query = "SELECT event FROM events WHERE calendar = ? AND end > ? AND start < ?"
+        params = [calendar, time_min.timestamp(), time_max.timestamp()]
+        if q:
+            query += " AND json_extract(event, '$.summary') LIKE ?"
+            params.append(f"%{q}%")
+        with self.lock:
+            rows = self.db.execute(query + " ORDER BY start, id", params).fetchall()
+        return [json.loads(i) for i, in rows]
+
+    def stats(self) -> dict:
+        """Summary of stored events per calendar."""
+        rows = self.db.execute(
+            "SELECT e.calendar, COUNT(*), MIN(e.start), MAX(e.start), s.synced FROM events e "
+            "LEFT JOIN sync s ON s.calendar = e.calendar GROUP BY e.calendar ORDER BY e.calendar"
+        ).fetchall()
+        return {
+            "path": str(self.path),
+            "size_kb": round(self.path.stat().st_size / 1024, 1),
+            "calendars": [
+                {
+                    "calendar": calendar,
+                    "events": count,
+                    "first": time.strftime("%Y-%m-%d", time.localtime(first)),
+                    "last": time.strftime("%Y-%m-%d", time.localtime(last)),
+                    "synced": time.strftime("%Y-%m-%d %H:%M", time.localtime(synced)) if synced else "never",
+                }
+                for calendar, count, first, last, synced in rows
+            ],
+        }
+
+    def purge(self) -> int:
+        """Remove every stored event and sync token, returns number of events removed."""
+        with self.db:
+            removed = self.db.execute("DELETE FROM events").rowcount
+            self.db.execute("DELETE FROM sync")
+        self.db.execute("VACUUM")
+        return removed
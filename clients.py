@@ -0,0 +1,115 @@
+from functools import cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Final
+
+if TYPE_CHECKING:
+    import pygsheets
+    import requests
+    from atlassian import Confluence, Jira
+    from google.oauth2.credentials import Credentials
+
+"""
+Process-wide registry of authenticated clients.
+
+Each client is built on first use and reused for the rest of the process, so token files are
+read, OAuth refreshed and keyring queried once per run instead of once per GoogleTools/JiraTools/
+open_gsheet call. Clients of the same service share one HTTP connection pool (keep-alive).
+
+The client libraries are imported inside the factories, importing this module is cheap and a
+command only pays for the libraries of the services it actually uses.
+"""
+
+CREDENTIALS_DIR: Final = Path("~/Google Drive/My Drive/Scripts").expanduser()
+
+# If modifying these scopes, delete the file google_token.json
+GOOGLE_SCOPES: Final = [
+    "https://www.googleapis.com/auth/calendar.events",
+    "https://www.googleapis.com/auth/gmail.readonly",
+]
+ATLASSIAN_POOL_SIZE: Final = 16  # keep-alive connections, covers JiraTools workers for concurrent jobs
+
+
+@cache
+def google_credentials() -> "Credentials":
+    """OAuth credentials for Gmail/Calendar, refreshed or re-authorized (browser) when needed."""
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+
+    creds_file = CREDENTIALS_DIR.joinpath("google_token.json")
+
+    creds = None
+    if creds_file.exists():
+        creds = Credentials.from_authorized_user_file(creds_file, GOOGLE_SCOPES)
+
+    if not creds or not creds.valid:
+        if creds and creds.expired and creds.refresh_token:
+            creds.refresh(Request())
+        else:
+            flow = InstalledAppFlow.from_client_secrets_file(f"{CREDENTIALS_DIR}/credentials.json", GOOGLE_SCOPES)
+            creds = flow.run_local_server(port=0)
+
+        with open(creds_file, "w") as token:
+            token.write(creds.to_json())
+    return creds
+
+
+@cache
+def google_service(name: str, version: str):
+    """Google API service, i.e. google_service("gmail", "v1").
+
+    Discovery documents come from the copies bundled with google-api-python-client,
+    so building a service never makes a discovery request.
+    """
+    from googleapiclient.discovery import build
+
+    return build(name, version, credentials=google_credentials(), static_discovery=True)
+
+
+@cache
+def gsheets_client() -> "pygsheets.client.Client":
+    """Authorized pygsheets client, shared by every open_gsheet call in the process."""
+    import pygsheets
+
+    return pygsheets.authorize(credentials_directory=CREDENTIALS_DIR, local=True)
+
+
+@cache
+def atlassian_credentials() -> tuple[str, str]:
+    """CAS username and password from keyring."""
+    import keyring
+
+    cas_user = keyring.get_password("cas", "user")
+    return cas_user, keyring.get_password("cas", cas_user)
+
+
+@cache
+def atlassian_session() -> "requests.Session":
+    """HTTP session shared by the Jira and Confluence clients."""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=ATLASSIAN_POOL_SIZE))
+    return session
+
+
+@cache
+def jira_client() -> "Jira":
+    import keyring
+    from atlassian import Jira
+
+    cas_user, cas_pass = atlassian_credentials()
+    jira_url = keyring.get_password("jira", "url")
+    # jira_url = "https://servicedesk-stage.cenic.org/"
+    return Jira(url=jira_url, username=cas_user, password=cas_pass, session=atlassian_session())
+
+
+@cache
+def confluence_client() -> "Confluence":
+    import keyring
+    from atlassian import Confluence
+
+    cas_user, cas_pass = atlassian_credentials()
+    confl_url = keyring.get_password("confluence", "url")
+    return Confluence(url=confl_url, username=cas_user, password=cas_pass, session=atlassian_session())
@@ -0,0 +1,106 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Final, Iterable
+
+"""
+SQLite cache of Jira issues, keyed by issue key and the requested field set.
+Rows store the epoch time they were fetched, so JiraTools can revalidate them
+against the issue 'updated' timestamp instead of re-downloading every ticket.
+"""
+
+SCHEMA: Final = """
+CREATE TABLE IF NOT EXISTS issues (
+    key TEXT NOT NULL,
+    fieldset TEXT NOT NULL,
+    fetched REAL NOT NULL,
+    fields TEXT NOT NULL,
+    PRIMARY KEY (key, fieldset)
+);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+class IssueCache:
+    def __init__(self, path: Path):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+
+        # scheduled jobs share one JiraTools across threads, so every access goes through the lock
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+
+    @staticmethod
+    def fieldset(fields: Iterable[str]) -> str:
+        """Normalized cache key for a list of requested fields."""
+        return ",".join(sorted(set(fields)))
+
+    def get(self, keys: list[str], fields: list[str]) -> dict[str, tuple[float, dict]]:
+        """Return {key: (fetched, fields)} for every key cached with this field set."""
+        fieldset = self.fieldset(fields)
+        cached = {}
+        for i in range(0, len(keys), 500):  # stay under the sqlite variable limit
+            chunk = keys[i : i + 500]
+            with self.lock:
+                rows = self.db.execute(
+                    f"SELECT key, fetched, fields FROM issues WHERE fieldset = ? AND key IN ({', '.join('?' * len(chunk))})",
+                    [fieldset, *chunk],
+                ).fetchall()
+            cached.update({key: (fetched, json.loads(data)) for key, fetched, data in rows})
+        return cached
+
+    def put(self, issues: dict[str, dict], fields: list[str], fetched: float) -> None:
+        """Store {key: fields} as fetched at the given epoch time."""
+        fieldset = self.fieldset(fields)
+        with self.lock, self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO issues VALUES (?, ?, ?, ?)",
+                [(key, fieldset, fetched, json.dumps(data)) for key, data in issues.items()],
+            )
+
+    def record(self, hits: int, misses: int) -> None:
+        """Add to the in-process and persisted hit/miss counters."""
+        with self.lock, self.db:
+            self.hits += hits
+            self.misses += misses
+            self.db.executemany(
+                "INSERT INTO counters VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                [("hits", hits), ("misses", misses)],
+            )
+
+    def stats(self) -> dict:
+        """Summary of cache contents and lifetime hit/miss counters."""
+        counters = dict(self.db.execute("SELECT name, value FROM counters"))
+        fieldsets = self.db.execute(
+            "SELECT fieldset, COUNT(*), MIN(fetched), MAX(fetched) FROM issues GROUP BY fieldset ORDER BY fieldset"
+        ).fetchall()
+        return {
+            "path": str(self.path),
+            "size_kb": round(self.path.stat().st_size / 1024, 1),
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+            "fieldsets": [
+                {
+                    "fields": fieldset,
+                    "issues": count,
+                    "oldest": time.strftime("%Y-%m-%d %H:%M", time.localtime(oldest)),
+                    "newest": time.strftime("%Y-%m-%d %H:%M", time.localtime(newest)),
+                }
+                for fieldset, count, oldest, newest in fieldsets
+            ],
+        }
+
+    def purge(self) -> int:
+        """Remove every cached issue and reset counters, returns number of issues removed."""
+        with self.db:
+            removed = self.db.execute("DELETE FROM issues").rowcount
+            self.db.execute("DELETE FROM counters")
+        self.db.execute("VACUUM")
+        return removed
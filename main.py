@@ -1,13 +1,20 @@
 import base64
 import csv
 import datetime
+import json
 import re
-from typing import Final
+from functools import cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Final
 
 import typer
 import yaml
 
-from tools import GoogleTools, JiraTools
+if TYPE_CHECKING:
+    from tools import GoogleTools, JiraTools
+
+# tools/clients/scheduler (pandas, Google and Atlassian libraries) are imported by the commands that
+# use them, so --help and light commands start quickly. See 'benchmarks.py import-time'.
 
 main = typer.Typer(
     add_completion=False,
@@ -17,7 +24,38 @@ individually or regularly via a scheduler.
 """,
 )
 
+# concurrent requests per service for scheduled runs, httplib2 (Google APIs) is not thread-safe so those stay at 1
+JIRA_LIMIT: Final = 4
+SHEETS_LIMIT: Final = 1
+GOOGLE_LIMIT: Final = 1
+
 RH_LABEL: Final[str] = "Label_3737818148016423963"
+RH_LEDGER: Final = Path("billables.csv")
+RH_CHECKPOINT: Final = Path("billables_checkpoint.json")
+RH_HEADER: Final = ["VENDOR", "TICKET", "CHARGE", "BILLABLE MIN", "DATE"]
+
+# one alternation per RH email field, values stay on the same line as their label
+RH_FIELDS: Final = re.compile(
+    r"Vendor:[ \t]*(?P<vendor>\w+(?:[ \t]\w+)?)"
+    r"|Jira Ticket:\s*(?P<ticket>\S+)"
+    r"|Charge:[ \t]*(?P<charge>\w+(?:[ \t]\w+)?)"
+    r"|Billable Time.*:\s*(?P<billable>\d+\s\w+\s\d+\s\w+|\d+\.\d+\s\w+|\d+\s\w+)"
+)
+
+
+@cache
+def jira_tools() -> "JiraTools":
+    """JiraTools shared by every command in the process, built on first use."""
+    from tools import JiraTools
+
+    return JiraTools()
+
+
+@cache
+def google_tools() -> "GoogleTools":
+    from tools import GoogleTools
+
+    return GoogleTools()
 
 
 def open_yaml():
@@ -27,81 +65,148 @@ def open_yaml():
 
 
 def decode_mail_payload(message: dict) -> str:
+    """Return the message body, preferring the first text/plain part of multipart messages.
+    Gmail encodes body data as unpadded base64url.
+    """
+    parts, fallback = [message["payload"]], None
+    while parts:
+        part = parts.pop(0)
+        parts.extend(part.get("parts", []))
+        if data := part.get("body", {}).get("data"):
+            if part.get("mimeType") == "text/plain":
+                break
+            fallback = fallback or data
+    else:
+        data = fallback
+    if not data:
+        return ""
+
     try:
-        return base64.b64decode(message["payload"]["body"]["data"]).decode("utf-8")
+        return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4)).decode("utf-8")
     except UnicodeDecodeError:
         print(message["snippet"])
         return ""
 
 
-def parse_rh_message(message: str) -> list[str | int]:
-    def re_search(regex):
-        result = re.search(regex, message)
-        if result:
-            return result.group()
-        return None
-
-    def format_return(raw: str) -> str:
-        if raw:
-            return raw.split(":")[1].strip().upper()
+def parse_billable_time(input_time: str) -> int | str:
+    """Return time in minutes."""
+    if not input_time:
         return ""
 
-    def parse_time(input_time: str) -> int:
-        """Return time in minutes."""
-        if not input_time:
-            return ""
+    t_list = input_time.split()
+    if len(t_list) <= 2:
+        return int(float(t_list[0]) * 60)  # assume its an integer of hours if len == 1
+    elif len(t_list) == 3:
+        ...  # not sure if this is possible
+    elif len(t_list) == 4:
+        return int(float(t_list[0]) * 60 + float(t_list[2]))
 
-        t_list = input_time.split()
-        if len(t_list) <= 2:
-            return int(float(t_list[0]) * 60)  # assume its an integer of hours if len == 1
-        elif len(t_list) == 3:
-            ...  # not sure if this is possible
-        elif len(t_list) == 4:
-            return int(float(t_list[0]) * 60 + float(t_list[2]))
 
-    charge = format_return(re_search(r"Charge:\s*((\w+\s\w+)|(\w+))"))
-    vendor = format_return(re_search(r"Vendor:\s*((\w+\s\w+)|(\w+))"))
-    ticket = format_return(re_search(r"Jira Ticket:\s*\S+"))
-    billable = format_return(re_search(r"Billable Time.*:\s*((\d+\s\w+\s\d+\s\w+)|(\d+\.\d+\s\w+)|(\d+\s\w+))"))
+def parse_rh_message(message: str) -> list[str | int]:
+    """Return [vendor, ticket, charge, billable minutes] from an RH email body.
+
+    All fields are found in a single scan with RH_FIELDS, the first match of each field wins.
+    """
+    found = {}
+    for match in RH_FIELDS.finditer(message):
+        found.setdefault(match.lastgroup, match[match.lastgroup])
+        if len(found) == 4:
+            break
 
-    return [vendor, ticket, charge, parse_time(billable)]
+    vendor, ticket, charge = (found.get(i, "").strip().upper() for i in ("vendor", "ticket", "charge"))
+    return [vendor, ticket, charge, parse_billable_time(found.get("billable", ""))]
 
 
 def convert_date(epoch_ms: str) -> str:
     return datetime.datetime.utcfromtimestamp(int(epoch_ms) / 1000).strftime("%Y-%m-%d")
 
 
-@main.command()
-def rh_emails(
-    start_date: str = typer.Option("", help="Search start date, YYYY/MM/DD"),
-    end_date: str = typer.Option("", help="Search end date, YYYY/MM/DD"),
-):
-    google = GoogleTools()
-    rh_mail = google.get_mail_by_label(RH_LABEL, start_date=start_date, end_date=end_date)
-
-    output = []
-    for mail in rh_mail["messages"]:
-        message_raw = google.get_mail_by_id(mail["id"])
+def parse_rh_mail(google: "GoogleTools", mail_ids: list[str]) -> tuple[list[list[str | int]], set[str]]:
+    """Fetch and parse RH emails into billables rows. Also returns the IDs that are done with: fetched,
+    or gone for good (i.e. deleted). get_mail_batch skips messages it couldn't retrieve for now.
+    """
+    output, gone = [], []
+    messages = google.get_mail_batch(mail_ids, gone=gone)
+    fetched = set(gone)
+    for message_raw in messages:
+        fetched.add(message_raw["id"])
         payload = decode_mail_payload(message_raw)
         if payload:
             msg_date = convert_date(message_raw["internalDate"])
             msg_output = parse_rh_message(payload)
             msg_output.append(msg_date)
             output.append(msg_output)
+    return output, fetched
+
+
+def save_rh_checkpoint(history_id: str, message_ids: set[str], pending: list[str] = ()) -> None:
+    """pending: listed but not fetched IDs, the next incremental run retries them."""
+    with open(RH_CHECKPOINT, "w") as f:
+        json.dump({"history_id": history_id, "message_ids": sorted(message_ids), "pending": list(pending)}, f)
 
-    with open("billables.csv", "w", encoding="UTF-8") as f:
+
+@main.command()
+def rh_emails(
+    start_date: str = typer.Option("", help="Search start date, YYYY/MM/DD"),
+    end_date: str = typer.Option("", help="Search end date, YYYY/MM/DD"),
+    incremental: bool = typer.Option(
+        False, help="Only parse emails that arrived since the last run and append them to billables.csv."
+    ),
+):
+    """Parse Remote Hands emails into billables.csv.
+
+    Runs listing up to now save the mailbox historyId and processed message IDs to a checkpoint
+    file, which --incremental uses to find new emails without re-listing the label. Runs with an
+    end date don't, since mail after it wouldn't be covered by the checkpoint. Incremental runs
+    ignore the end date, and do a full listing (rewriting billables.csv) if there is no checkpoint.
+    """
+    google = google_tools()
+
+    processed, mail_ids, checkpointed = set(), None, False
+    if incremental and RH_CHECKPOINT.exists():
+        with open(RH_CHECKPOINT, "r") as f:
+            checkpoint = json.load(f)
+        processed, checkpointed = set(checkpoint["message_ids"]), True
+        if history := google.get_mail_history(RH_LABEL, checkpoint["history_id"]):
+            mail_ids, history_id = history
+            mail_ids = list(dict.fromkeys(checkpoint.get("pending", []) + mail_ids))
+
+    save = incremental or not end_date  # a checkpoint must cover everything up to history_id
+    if save:
+        # 'before:' leaves out the whole day, so list through today
+        end_date = (datetime.date.today() + datetime.timedelta(days=1)).strftime("%Y/%m/%d")
+
+    if mail_ids is None:
+        history_id = google.get_history_id()  # before listing, so nothing arriving mid-run is missed
+        mail_ids = [i["id"] for i in google.get_mail_by_label(RH_LABEL, start_date=start_date, end_date=end_date)]
+
+    new_ids = [i for i in mail_ids if i not in processed]
+    if not new_ids:
+        if save:
+            save_rh_checkpoint(history_id, processed)
+        print("No new RH emails.")
+        return
+
+    output, fetched = parse_rh_mail(google, new_ids)
+    # only append to a ledger the checkpoint describes, anything else would duplicate its rows
+    append = checkpointed and RH_LEDGER.exists()
+    with open(RH_LEDGER, "a" if append else "w", encoding="UTF-8") as f:
         writer = csv.writer(f)
-        writer.writerow(["VENDOR", "TICKET", "CHARGE", "BILLABLE MIN", "DATE"])
-        for i in output:
-            writer.writerow(i)
+        if not append:
+            writer.writerow(RH_HEADER)
+        writer.writerows(output)
+
+    if save:
+        save_rh_checkpoint(history_id, processed | fetched, [i for i in new_ids if i not in fetched])
+    print(f"{'Appended' if append else 'Wrote'} {len(output)} RH emails to {RH_LEDGER}")
 
 
 @main.command()
 def core_tickets():
     """Return all tickets for designated engineers and dumps as pd to gsheet."""
-    jql_tickets = "assignee={engineer} and status not in (Resolved, Deleted, Done, Merged) order by project ASC"
+    jql_tickets = "assignee in ({engineers}) and status not in (Resolved, Deleted, Done, Merged) order by project ASC"
     eng_list = open_yaml()["engineer"]
-    jtools.core_tickets(eng_list, jql_tickets)
+    jira_tools().core_tickets(eng_list, jql_tickets)
 
 
 @main.command()
@@ -112,7 +217,8 @@ def update_resource_buckets():
     Circuits: Updates hours based on active circuits, and updates start/end dates.
     """
     data = open_yaml()
-    engineer_list = GoogleTools().get_engrv(data["engrv_url"])
+    engineer_list = google_tools().get_engrv(data["engrv_url"])
+    jtools = jira_tools()
     jtools.update_engrv(engineer_list, data["engrv_tickets"], data["engrv_hours"])
     jtools.update_circuit(data["circuit_hours"])
 
@@ -123,16 +229,15 @@ def calendar_pull():
     and dump to gSheet
     """
     data = open_yaml()
-    gtools = GoogleTools()
-    gtools.weekly_events(data["maint_url"], data["ic_url"])
+    google_tools().weekly_events(data["maint_url"], data["ic_url"], jira=jira_tools())
 
 
 @main.command()
 def resources_report():
     """Pull weekly resources report and dump to sheet."""
     data = open_yaml()
-    jql_string = 'assignee={engineer} and status = "In Progress" and originalEstimate > 0 and "End date" >= now() and "Start date" <= now()'
-    jtools.resources_reporting(data["engineer"], jql_string)
+    jql_string = 'assignee in ({engineers}) and status = "In Progress" and originalEstimate > 0 and "End date" >= now() and "Start date" <= now()'
+    jira_tools().resources_reporting(data["engineer"], jql_string)
 
 
 @main.command()
@@ -140,48 +245,100 @@ def cor_updates():
     """Pull weekly COR Jira ticket updates."""
     jql_tickets = 'project = "CENIC Core Projects" and (updated > startOfWeek() or createdDate > startOfWeek() or resolutiondate > startOfWeek()) ORDER BY updated ASC'
     eng_list = open_yaml()["engineer"]
-    jtools.cor_project_updates(eng_list, jql_tickets)
+    jira_tools().cor_project_updates(eng_list, jql_tickets)
 
 
 @main.command()
 def cpe_tracker():
     """Update CPE Hardware Tracker data."""
-    jtools.get_cpe_tracker_info()
+    jira_tools().get_cpe_tracker_info()
 
 
 @main.command()
 def purchasing_tracker():
     """Purchasing Tracker for all Core purchasing."""
     core_list = open_yaml()["core_all"]
-    jtools.purchases_tracking(core_list)
+    jira_tools().purchases_tracking(core_list)
 
 
 @main.command()
 def la2_tracker():
     """LA2 status tracker for the migration."""
-    jtools.la2_migration_status()
+    jira_tools().la2_migration_status()
 
 
 @main.command()
 def scheduled():
-    """Main function for scheduled runs."""
-    core_tickets()
-    cpe_tracker()
-    la2_tracker()
+    """Main function for scheduled runs.
+
+    Jobs run concurrently on shared Jira/Google sessions, with per-service request limits.
+    A summary of duration and requests per job is printed at the end, exits with 1 if any job failed.
+    """
+    jobs = [core_tickets, cpe_tracker, la2_tracker]
     day = datetime.datetime.now().strftime("%a")
     if day == "Mon":
-        # update_resource_buckets()
-        calendar_pull()
-        purchasing_tracker()
+        # jobs.append(update_resource_buckets)
+        jobs += [calendar_pull, purchasing_tracker]
 
     elif day == "Fri":
-        # resources_report()
-        cor_updates()
+        # jobs.append(resources_report)
+        jobs.append(cor_updates)
+
+    from clients import google_service, gsheets_client
+    from scheduler import ServiceLimiter, run_jobs
+
+    # authorize everything up front on the main thread, OAuth flows may need a browser
+    jira_limiter = ServiceLimiter("jira", JIRA_LIMIT)
+    jira_limiter.install(jira_tools().jira.session)
+
+    sheets_limiter = ServiceLimiter("sheets", SHEETS_LIMIT)
+    client = gsheets_client()
+    for service in (client.sheet.service, client.drive.service):
+        sheets_limiter.install(service._http)
+
+    if calendar_pull in jobs:
+        google_limiter = ServiceLimiter("google", GOOGLE_LIMIT)
+        for service in (google_service("calendar", "v3"), google_service("gmail", "v1")):
+            google_limiter.install(service._http)
+
+    results = run_jobs({job.__name__: job for job in jobs})
+    if any(i.error for i in results):
+        raise typer.Exit(1)
+
+
+@main.command()
+def jira_cache(purge: bool = typer.Option(False, help="Delete all cached issues and reset counters.")):
+    """Show Jira issue cache statistics, or purge the cache."""
+    issue_cache = jira_tools().cache
+    if purge:
+        print(f"Removed {issue_cache.purge()} cached issues.")
+        return
+
+    stats = issue_cache.stats()
+    print(f"{stats['path']} ({stats['size_kb']} KB)")
+    print(f"hits: {stats['hits']}, misses: {stats['misses']}")
+    for i in stats["fieldsets"]:
+        print(f"  {i['issues']:>6} issues, fetched {i['oldest']} - {i['newest']}: {i['fields']}")
+
+
+@main.command()
+def calendar_store(purge: bool = typer.Option(False, help="Delete all stored events, the next run does a full sync.")):
+    """Show local calendar event store statistics, or purge the store."""
+    store = google_tools().store
+    if purge:
+        print(f"Removed {store.purge()} stored events.")
+        return
+
+    stats = store.stats()
+    print(f"{stats['path']} ({stats['size_kb']} KB)")
+    for i in stats["calendars"]:
+        print(f"  {i['events']:>6} events, {i['first']} - {i['last']}, synced {i['synced']}: {i['calendar']}")
 
 
 @main.command()
 def create_predep(master_ticket: str):
     """Create Install, Migration, Closeout child tickets."""
+    jtools = jira_tools()
     summary = jtools.get_ticket_summary(master_ticket)
     jtools.create_ticket(master_ticket, summary.replace("Circuit Install", "Install Planning"))
     jtools.create_ticket(master_ticket, summary.replace("Circuit Install", "Migration Planning"))
@@ -199,6 +356,7 @@ def convert_dep(master_ticket: str, noc_ticket: str):
         if not j:
             data[i] = ""
 
+    jtools = jira_tools()
     fields = jtools.get_ticket_fields(noc_ticket)
     dep_ticket = jtools.create_dep_install(
         master_ticket,
@@ -248,5 +406,4 @@ def convert_dep(master_ticket: str, noc_ticket: str):
 
 
 if __name__ == "__main__":
-    jtools = JiraTools()
     main()
@@ -1,4 +1,5 @@
-import re
+import time
+from collections import Counter
 from enum import Enum
 from typing import Any
 
@@ -7,6 +8,7 @@ import typer
 import urllib3
 import yaml
 from pynautobot import api
+from trunk_ids import TrunkIdAllocator
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -43,6 +45,65 @@ class PortType(str, Enum):
     sc = "sc"
 
 
+RESOLVER_TTL = 300  # seconds a looked up site/device/tenant/region/rack role is reused
+
+
+class Resolver:
+    """Memoized get() lookups of sites, devices, tenants, regions and rack roles.
+
+    A lookup is answered from memory for ttl seconds after it was fetched, so a cable.yaml batch against
+    the same site and panels fetches each of them once. Lookups that find nothing aren't cached, and
+    invalidate() drops entries that are known to have changed.
+    """
+
+    ENDPOINTS = {
+        "sites": ("dcim", "sites"),
+        "devices": ("dcim", "devices"),
+        "tenants": ("tenancy", "tenants"),
+        "regions": ("dcim", "regions"),
+        "rack_roles": ("dcim", "rack_roles"),
+    }
+
+    def __init__(self, nautobot, ttl: float = RESOLVER_TTL):
+        self.nautobot = nautobot
+        self.ttl = ttl
+        self.cache: dict[tuple, tuple[float, Any]] = {}  # (kind, filters) -> (fetched, record)
+        self.hits = Counter()
+        self.misses = Counter()
+
+    def get(self, kind: str, **filters) -> Any:
+        """Same as <endpoint>.get(**filters), i.e. get("devices", name="HUB-LAX-R1-U10", site="lax")."""
+        key = (kind, tuple(sorted(filters.items())))
+        if (cached := self.cache.get(key)) and time.monotonic() - cached[0] < self.ttl:
+            self.hits[kind] += 1
+            return cached[1]
+
+        self.misses[kind] += 1
+        app, endpoint = self.ENDPOINTS[kind]
+        record = getattr(getattr(self.nautobot, app), endpoint).get(**filters)
+        if record is not None:
+            self.cache[key] = (time.monotonic(), record)
+        return record
+
+    def invalidate(self, kind: str | None = None, **filters) -> None:
+        """Drop cached lookups, all of them, all of a kind, or the one matching filters."""
+        if kind is None:
+            self.cache.clear()
+        elif filters:
+            self.cache.pop((kind, tuple(sorted(filters.items()))), None)
+        else:
+            self.cache = {key: value for key, value in self.cache.items() if key[0] != kind}
+
+    def site(self, site_code: str) -> Any:
+        return self.get("sites", name=site_code.upper())
+
+    def device(self, name: str, site) -> Any:
+        return self.get("devices", name=name, site=site.slug)
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        return {kind: {"hits": self.hits[kind], "misses": self.misses[kind]} for kind in self.hits | self.misses}
+
+
 class NBTools:
     """Misc. Nautobot scripts"""
 
@@ -52,54 +113,48 @@ class NBTools:
             token=keyring.get_password("nautobot_stage", keyring.get_password("cas", "user") + "mfa"),
         )
         self.nautobot.http_session.verify = False
-        self.LAST_CABLE_ID = None
+        self.trunk_ids = TrunkIdAllocator(self.nautobot)
+        self.resolver = Resolver(self.nautobot)
+        self.port_index: dict[str, dict[str, tuple[Any, str]]] = {}  # device ID -> port name -> (port, type)
+
+    def device_ports(self, device) -> dict[str, tuple[Any, str]]:
+        """All ports of a device by name, fetched with one list call each for interfaces, rear ports
+        and front ports on first use. A FrontPort wins over a RearPort or Interface of the same name.
+        """
+        if device.id not in self.port_index:
+            ports = {}
+            for endpoint, port_type in (
+                (self.nautobot.dcim.interfaces, "dcim.interface"),
+                (self.nautobot.dcim.rear_ports, "dcim.rearport"),
+                (self.nautobot.dcim.front_ports, "dcim.frontport"),
+            ):
+                ports.update({port.name: (port, port_type) for port in endpoint.filter(device_id=device.id)})
+            self.port_index[device.id] = ports
+        return self.port_index[device.id]
 
     def guess_port_type(self, port_name: str, port_device_slug: str) -> tuple[Any, str]:
-        """Determine if given port is FrontPort, RearPort, or Interface. None is returned if not found
-        from the nautobot get method.
+        """Determine if given port is FrontPort, RearPort, or Interface, from the device's port index.
 
         Return:
             port: Nautobot port object, one of Front, RearPort, Interface
             port_type: type of Nautobot port for the api
         """
-        if port := self.nautobot.dcim.front_ports.get(device_id=port_device_slug.id, name=port_name):
-            return port, "dcim.frontport"
-        elif port := self.nautobot.dcim.rear_ports.get(device_id=port_device_slug.id, name=port_name):
-            return port, "dcim.rearport"
-        elif port := self.nautobot.dcim.interfaces.get(device_id=port_device_slug.id, name=port_name):
-            return port, "dcim.interface"
-        else:
+        try:
+            return self.device_ports(port_device_slug)[port_name]
+        except KeyError:
             raise Exception(
                 f"No matching Front/RearPort or Interface was found for '{port_device_slug}' and '{port_name}'."
-            )
-
-    def _next_cable_id(self) -> int:
-        """Get last used cabled ID (i.e. CLR increment)."""
-        cables = self.nautobot.dcim.cables.all()
-        cable_labels = tuple(map(lambda x: x.label, cables))
-        trunk_cables = []
-        for i in cable_labels:
-            label = re.search("--C[0-9]{4}$", i)
-            if label:
-                trunk_cables.append(label.group())
-        trunk_cables.sort()
-
-        return int(trunk_cables[-1].split("--C")[1]) + 1
+            ) from None
 
     def _create_com_label(self, device_1_name, device_2_name) -> str:
-        if not self.LAST_CABLE_ID:
-            self.LAST_CABLE_ID = self._next_cable_id()
-        else:
-            self.LAST_CABLE_ID += 1
-        cable_id = "C" + str(self.LAST_CABLE_ID).rjust(4, "0")
-        return f"COM--{device_1_name}--{device_2_name}--{cable_id}"
+        return self.trunk_ids.label(device_1_name, device_2_name)
 
     def create_new_site(self, site_code: str, site_name: str, address: str, tenant: str) -> None:
-        tenant_id = self.nautobot.tenancy.tenants.get(slug=tenant.lower()).id
+        tenant_id = self.resolver.get("tenants", slug=tenant.lower()).id
         new_site = self.nautobot.dcim.sites.create(
             name=site_code,
             status="active",
-            region=self.nautobot.dcim.regions.get(slug="ca").id,
+            region=self.resolver.get("regions", slug="ca").id,
             description=site_name,
             tenant=tenant_id,
             physical_address=address,
@@ -111,7 +166,7 @@ class NBTools:
             name="CPE_RACK",
             tenant=tenant_id,
             status="active",
-            role=self.nautobot.dcim.rack_roles.get(slug="associate").id,
+            role=self.resolver.get("rack_roles", slug="associate").id,
             comments="# NOT A REAL RACK\nThis is an abstraction only, Associate racks are not tracked or managed by CENIC.",
         )
         print("Created CPE Rack")
@@ -123,36 +178,48 @@ class NBTools:
         num_ports: int,
         port_type: str,
         jumper_type: str,
+        per_port: bool = False,
     ) -> None:
-        site = self.nautobot.dcim.sites.get(name=site_code.upper())
-        device = self.nautobot.dcim.devices.get(name=name, site=site.slug)
-
-        for i in range(1, num_ports * 2, 2):
-            port_name = f"Port {i}/{i + 1} "
-            rp = self.nautobot.dcim.rear_ports.create(
-                device=device.id,
-                type=port_type,
-                positions=1,
-                custom_fields={"jumper_type": jumper_type.upper()},
-                name=f"Port {i}/{i + 1} Rear",
+        """Create simplex rear/front port pairs, all rear ports in one bulk POST and then all front
+        ports in a second one using the returned rear port IDs. per_port creates them one request each.
+        """
+        site = self.resolver.site(site_code)
+        device = self.resolver.device(name, site)
+        port_names = [f"Port {i}/{i + 1} " for i in range(1, num_ports * 2, 2)]
+        port_data = {"device": device.id, "type": port_type, "custom_fields": {"jumper_type": jumper_type.upper()}}
+
+        start = time.perf_counter()
+        if per_port:
+            for port_name in port_names:
+                rp = self.nautobot.dcim.rear_ports.create(name=port_name + "Rear", positions=1, **port_data)
+                print(f"Created port: {port_name + 'Rear'}")
+                self.nautobot.dcim.front_ports.create(name=port_name + "Front", rear_port=rp.id, **port_data)
+                print(f"Created port: {port_name + 'Front'}")
+        else:
+            rear_ports = self.nautobot.dcim.rear_ports.create(
+                [{"name": port_name + "Rear", "positions": 1, **port_data} for port_name in port_names]
             )
-            print(f"Created port: {port_name + 'Rear'}")
+            rear_ids = {rp.name: rp.id for rp in rear_ports}
             self.nautobot.dcim.front_ports.create(
-                device=device.id,
-                rear_port=rp.id,
-                type=port_type,
-                custom_fields={"jumper_type": jumper_type.upper()},
-                name=f"Port {i}/{i + 1} Front",
+                [
+                    {"name": port_name + "Front", "rear_port": rear_ids[port_name + "Rear"], **port_data}
+                    for port_name in port_names
+                ]
             )
-            print(f"Created port: {port_name + 'Front'}")
+
+        requests_made = len(port_names) * 2 if per_port else 2
+        print(
+            f"Created {len(port_names)} port pairs with {requests_made} requests in {time.perf_counter() - start:.1f}s"
+        )
 
     def connect_rear_ports(self, site_code: str, device_1_name: str, device_2_name: str, jumper_type: str) -> None:
-        site = self.nautobot.dcim.sites.get(name=site_code.upper())
-        device_1 = self.nautobot.dcim.devices.get(name=device_1_name, site=site.slug)
-        device_2 = self.nautobot.dcim.devices.get(name=device_2_name, site=site.slug)
+        site = self.resolver.site(site_code)
+        device_1 = self.resolver.device(device_1_name, site)
+        device_2 = self.resolver.device(device_2_name, site)
 
-        device_1_rp = self.nautobot.dcim.rear_ports.filter(device_id=device_1.id)
-        device_2_rp = self.nautobot.dcim.rear_ports.filter(device_id=device_2.id)
+        device_1_rp = list(self.nautobot.dcim.rear_ports.filter(device_id=device_1.id))
+        device_2_rp = list(self.nautobot.dcim.rear_ports.filter(device_id=device_2.id))
+        self.trunk_ids.reserve(min(len(device_1_rp), len(device_2_rp)))
 
         for i in zip(device_1_rp, device_2_rp):
             cable_label = self._create_com_label(device_1.name, device_2.name)
@@ -168,7 +235,7 @@ class NBTools:
             )
             print(f"Created new cable: {cable_label}")
 
-    def create_jumper(
+    def _jumper(
         self,
         site_code: str,
         device_1: str,
@@ -180,10 +247,11 @@ class NBTools:
         status: str,
         length: int = 0,
         length_unit: str = "m",
-    ) -> None:
-        site = self.nautobot.dcim.sites.get(name=site_code.upper())
-        term_a_device = self.nautobot.dcim.devices.get(name=device_1, site=site.slug)
-        term_b_device = self.nautobot.dcim.devices.get(name=device_2, site=site.slug)
+    ) -> dict:
+        """Cable data for a jumper between two ports, the label 'next_trunk' takes the next trunk ID."""
+        site = self.resolver.site(site_code)
+        term_a_device = self.resolver.device(device_1, site)
+        term_b_device = self.resolver.device(device_2, site)
 
         if None in (term_a_device, term_b_device):
             print(term_a_device, term_b_device)
@@ -195,18 +263,31 @@ class NBTools:
         if label == "next_trunk":
             label = self._create_com_label(term_a_device.name, term_b_device.name)
 
-        self.nautobot.dcim.cables.create(
-            termination_a_id=term_a_port.id,
-            termination_b_id=term_b_port.id,
-            termination_a_type=term_a_port_type,
-            termination_b_type=term_b_port_type,
-            type=jumper_type,
-            status=status,
-            label=label,
-            length=length,
-            length_unit=length_unit,
-        )
-        print(f"Created new cable: {label}")
+        return {
+            "termination_a_id": term_a_port.id,
+            "termination_b_id": term_b_port.id,
+            "termination_a_type": term_a_port_type,
+            "termination_b_type": term_b_port_type,
+            "type": jumper_type,
+            "status": status,
+            "label": label,
+            "length": length,
+            "length_unit": length_unit,
+        }
+
+    def create_jumper(self, *args, **kwargs) -> None:
+        """Create one jumper, takes the arguments of _jumper."""
+        cable = self.nautobot.dcim.cables.create(**self._jumper(*args, **kwargs))
+        print(f"Created new cable: {cable.label}")
+
+    def create_jumpers(self, jumpers: list[dict]) -> None:
+        """Create jumpers (_jumper keyword arguments, i.e. from cable.yaml) with one bulk POST.
+        Ports are resolved from the per-device port index first, so nothing is created if one is missing.
+        """
+        self.trunk_ids.reserve(sum(jumper["label"] == "next_trunk" for jumper in jumpers))
+        cables = self.nautobot.dcim.cables.create([self._jumper(**jumper) for jumper in jumpers])
+        for cable in cables:
+            print(f"Created new cable: {cable.label}")
 
 
 @main.command()
@@ -233,10 +314,11 @@ def update_simplex_panel(
     num_ports: int = typer.Argument(..., help="Total number of duplex ports."),
     port_type: PortType = typer.Argument("lc", case_sensitive=False),
     jumper_type: JumperType = typer.Argument("smf", case_sensitive=False),
+    per_port: bool = typer.Option(False, help="Create each port with its own request, for timing comparison."),
 ):
     """Update a patch panel with simplex ports, i.e. 'Port 1/2 Front'."""
     nautobot = NBTools()
-    nautobot.update_simplex_panel(site_code, name, num_ports, port_type.value, jumper_type.value)
+    nautobot.update_simplex_panel(site_code, name, num_ports, port_type.value, jumper_type.value, per_port)
 
 
 @main.command()
@@ -273,9 +355,8 @@ def create_jumper(
 
     if yaml_input:
         with open("cable.yaml", "r") as f:
-            cables = yaml.safe_load(f)
-        for cable in cables:
-            nautobot.create_jumper(**cable)
+            nautobot.create_jumpers(yaml.safe_load(f))
+        print(f"Lookups: {nautobot.resolver.stats()}")
     else:
         nautobot.create_jumper(*list(cable.values()))
 
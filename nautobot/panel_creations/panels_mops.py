@@ -7,9 +7,12 @@
     - create shipping ticket for jumpers (and print to screen for the spreadsheet)
     - create jumpers install MOP ticket and MOP YAML (for input to the MOPs program)
 """
-import re
+import json
+import sys
 from collections import Counter
 from datetime import datetime
+from functools import cached_property
+from pathlib import Path
 
 import keyring
 import typer
@@ -18,6 +21,11 @@ import yaml
 from atlassian import Jira
 from jinja2 import Environment, FileSystemLoader
 from pynautobot import api
+from pynautobot.core.query import RequestError
+
+# nautobot/, for modules shared with nb_tools.py
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from trunk_ids import TrunkIdAllocator  # noqa: E402
 
 main = typer.Typer(
     add_completion=False,
@@ -25,6 +33,9 @@ main = typer.Typer(
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+FILTER_CHUNK_SIZE = 50  # device IDs per filtered list GET, keeps the query string short
+PANEL_ROLES = ["modular-panels", "modular-panel-cassettes"]
+
 
 class Data:
     def __init__(self):
@@ -59,155 +70,350 @@ class PanelsNautobot(Data):
         )
 
         self.nautobot.http_session.verify = False
-        self.tenant = self.nautobot.tenancy.tenants.get(slug="cenic-hubsite").id
-        self.remote_panel = self.nautobot.extras.relationships.get(name="remote_panel")
+        self.trunk_ids = TrunkIdAllocator(self.nautobot)
+
+    # looked up on first use, planning against a saved snapshot stays offline
+    @cached_property
+    def tenant(self):
+        return self.nautobot.tenancy.tenants.get(slug="cenic-hubsite").id
+
+    @cached_property
+    def remote_panel(self):
+        return self.nautobot.extras.relationships.get(name="remote_panel")
 
     def _next_cable_id(self):
-        # cables = tuple(self.nautobot.dcim.cables.filter(label__re=".*--C[0-9]{4}"))  # this is not working in nautobot-stage for some reason
-        # last_cable_label = sorted(tuple(map(lambda x: x.label, cables)))[-1]
-        # last_id = last_cable_label.split("--C")[-1]
-
-        cables = self.nautobot.dcim.cables.all()
-        cable_labels = tuple(map(lambda x: x.label, cables))
-        trunk_cables = []
-        for i in cable_labels:
-            if i:
-                label = re.search("--C[0-9]{4}$", i)
-                try:
-                    label.group()
-                except AttributeError:
-                    pass
-                else:
-                    trunk_cables.append(label.group())
-        trunk_cables.sort()
-
-        return "C" + str(int(trunk_cables[-1].split("--C")[1]) + 1).rjust(4, "0")
-
-    def _relate_panels(self, panels):
-        self.nautobot.extras.relationship_associations.create(
-            relationship=self.remote_panel.id,
-            source_type=self.remote_panel.destination_type,
-            source_id=panels[0].id,
-            destination_type=self.remote_panel.source_type,
-            destination_id=panels[1].id,
-        )
+        return f"C{self.trunk_ids.next_id():04d}"
+
+    def _bulk_create(self, endpoint, objects: list[dict]) -> list:
+        """Create all objects with one list POST, records come back in request order."""
+        if not objects:
+            return []
+        records = endpoint.create(objects)
+        print(f"Created {len(records)} {endpoint.name}")
+        return records
+
+    def _panel(self, panel: str) -> dict:
+        return {
+            "name": panel,
+            "site": {"slug": self.site.lower()},
+            "rack": {"name": panel.split("-")[2], "site__slug": self.site.lower()},
+            "position": int(panel.split("-U")[1]),
+            "face": "front",
+            "device_type": {"slug": "fhd-enclosure-blank"},
+            "device_role": {"slug": "modular-panels"},
+            "status": "active",
+        }
 
-    def _create_cassettes(self, panel, slot, cassette_type, name):
-        cassette = self.nautobot.dcim.devices.create(
-            name=panel.name + f" -- Slot {slot} {name}",
-            site={"slug": self.site.lower()},
-            rack={"name": panel.name.split("-")[2], "site__slug": self.site.lower()},
-            device_type={"slug": cassette_type},
-            device_role={"slug": "modular-panel-cassettes"},
-            status="active",
-            tenant=self.tenant,
-        )
-        self._assign_bays(panel, slot, cassette)
-        return cassette
-
-    def _assign_bays(self, panel, slot, cassette):
-        self.nautobot.dcim.device_bays.create(
-            device=panel.id,
-            name=f"Slot {slot}",
-            installed_device=cassette.id,
-        )
+    def _cassette(self, panel: str, name: str, cassette_type: str) -> dict:
+        return {
+            "name": name,
+            "site": {"slug": self.site.lower()},
+            "rack": {"name": panel.split("-")[2], "site__slug": self.site.lower()},
+            "device_type": {"slug": cassette_type},
+            "device_role": {"slug": "modular-panel-cassettes"},
+            "status": "active",
+        }
 
-    def _create_trunk(self):
-        try:
-            self.nautobot.dcim.cables.create(
-                type="smf",
-                termination_a_type="dcim.rearport",
-                termination_b_type="dcim.rearport",
-                termination_a_id=self.trunk_list[1].id,
-                termination_b_id=self.trunk_list[0].id,
-                status="connected",
-                label=f"COM--{self.new_panel_list[0].name}--{self.new_panel_list[1].name}--{self._next_cable_id()}",
-            )
-        except ValueError:
-            print(
-                f"CREATE MANUALLY: COM--{self.new_panel_list[0].name}--{self.new_panel_list[1].name}--CXXXX"
-            )
+    def _relation(self, source: str, destination: str) -> dict:
+        return {
+            "relationship": self.remote_panel.id,
+            "source_type": self.remote_panel.destination_type,
+            "source_id": source,
+            "destination_type": self.remote_panel.source_type,
+            "destination_id": destination,
+        }
 
-    def create_panels(self):
-        for panel_pair in self.panels_list:
-            self.new_panel_list, self.trunk_list = [], []
-            cassette_list, c6_list = [], []
-
-            for panel in panel_pair[0:2]:
-                # create panel
-                new_panel = self.nautobot.dcim.devices.create(
-                    name=panel,
-                    site={"slug": self.site.lower()},
-                    rack={"name": panel.split("-")[2], "site__slug": self.site.lower()},
-                    position=int(panel.split("-U")[1]),
-                    face="front",
-                    device_type={"slug": "fhd-enclosure-blank"},
-                    device_role={"slug": "modular-panels"},
-                    status="active",
-                    tenant=self.tenant,
-                )
-                print(f"Created panel: {new_panel.name}")
-                self.new_panel_list.append(new_panel)
+    def _prefetch(self, endpoint, device_ids: list[str], **filters) -> list:
+        """Records of all devices, one filtered list call per FILTER_CHUNK_SIZE IDs."""
+        field = filters.pop("field", "device_id")
+        records = []
+        for i in range(0, len(device_ids), FILTER_CHUNK_SIZE):
+            chunk = device_ids[i : i + FILTER_CHUNK_SIZE]
+            records.extend(endpoint.filter(**{field: chunk}, **filters))
+        return records
+
+    def fetch_snapshot(self) -> dict:
+        """Existing panels and cassettes at the site, with their bays, ports, cables and
+        remote_panel relationships, in 1 + 4 list calls per FILTER_CHUNK_SIZE devices.
+        """
+        devices = self.nautobot.dcim.devices.filter(
+            site=self.site.lower(), role=PANEL_ROLES
+        )
+        names = {i.id: i.name for i in devices}
+        ids = list(names)
+        snapshot = {
+            "site": self.site,
+            "fetched": datetime.now().isoformat(timespec="seconds"),
+            "devices": {
+                i.name: {
+                    "id": i.id,
+                    "device_bays": {},
+                    "rear_ports": {},
+                    "front_ports": [],
+                }
+                for i in devices
+            },
+            "relationships": [],
+        }
 
-                # create ports
-                trunk = self.nautobot.dcim.rear_ports.create(
-                    device=new_panel.id,
-                    name="Slot 1 Port 1 Rear",
-                    type="lc",
-                    positions=12,
-                    custom_fields={"jumper_type": "SMF"},
-                )
-                self.trunk_list.append(trunk)
-                for i in range(1, 13):
-                    self.nautobot.dcim.front_ports.create(
-                        device=new_panel.id,
-                        name=f"Slot 1 Port {2 * i - 1}/{2 * i} Front",
-                        type="lc",
-                        rear_port=trunk.id,
-                        rear_port_position=i,
-                        custom_fields={"jumper_type": "SMF"},
-                    )
+        for i in self._prefetch(self.nautobot.dcim.device_bays, ids):
+            installed = i.installed_device.name if i.installed_device else None
+            snapshot["devices"][names[i.device.id]]["device_bays"][i.name] = installed
+        for i in self._prefetch(self.nautobot.dcim.rear_ports, ids):
+            snapshot["devices"][names[i.device.id]]["rear_ports"][i.name] = {
+                "id": i.id,
+                "cable": i.cable.id if i.cable else None,
+            }
+        for i in self._prefetch(self.nautobot.dcim.front_ports, ids):
+            snapshot["devices"][names[i.device.id]]["front_ports"].append(i.name)
+        for i in self._prefetch(
+            self.nautobot.extras.relationship_associations,
+            ids,
+            field="source_id",
+            relationship=self.remote_panel.slug,
+        ):
+            if i.destination_id in names:
+                pair = [names[i.source_id], names[i.destination_id]]
+                snapshot["relationships"].append(pair)
+
+        print(f"Fetched {len(names)} panels/cassettes at {self.site}")
+        return snapshot
+
+    def build_panels(self) -> dict[str, list[dict]]:
+        """Object graph for every panel pair in data.yaml, by tier.
+
+        References to objects from an earlier tier are names, devices by device name
+        and rear ports by (device name, port name), swapped for IDs by create_panels.
+        """
+        tiers = {
+            "devices": [],
+            "device_bays": [],
+            "rear_ports": [],
+            "front_ports": [],
+            "relationships": [],
+            "cables": [],
+        }
+        for hub, spoke, cat6, _ in self.panels_list:
+            slots = []
+            for panel in (hub, spoke):
+                tiers["devices"].append(self._panel(panel))
 
-                # create and assign cassettes
+                # cassettes and device bays
                 cassette_type = "fhd-mpo-24lc-os2-cassette-type-a"
                 if panel.startswith("HUB"):
                     cassette_type += "f"
-                cassette = self._create_cassettes(
-                    new_panel, 1, cassette_type, "MPO24-LC OS2"
-                )
-                cassette_list.append(cassette)
-
-                if panel_pair[2]:
-                    c6_cassette = self._create_cassettes(
-                        new_panel, 4, "fhd-6xcopper-adapter", "Cat6"
+                cassettes = [(1, "MPO24-LC OS2", cassette_type)]
+                if cat6:
+                    cassettes.append((4, "Cat6", "fhd-6xcopper-adapter"))
+                for slot, name, device_type in cassettes:
+                    cassette = panel + f" -- Slot {slot} {name}"
+                    tiers["devices"].append(
+                        self._cassette(panel, cassette, device_type)
                     )
-                    c6_list.append(c6_cassette)
+                    tiers["device_bays"].append(
+                        {
+                            "device": panel,
+                            "name": f"Slot {slot}",
+                            "installed_device": cassette,
+                        }
+                    )
+                slots.append([f" -- Slot {slot} {name}" for slot, name, _ in cassettes])
 
-                    # create ports
+                # create ports
+                tiers["rear_ports"].append(
+                    {
+                        "device": panel,
+                        "name": "Slot 1 Port 1 Rear",
+                        "type": "lc",
+                        "positions": 12,
+                        "custom_fields": {"jumper_type": "SMF"},
+                    }
+                )
+                for i in range(1, 13):
+                    tiers["front_ports"].append(
+                        {
+                            "device": panel,
+                            "name": f"Slot 1 Port {2 * i - 1}/{2 * i} Front",
+                            "type": "lc",
+                            "rear_port": (panel, "Slot 1 Port 1 Rear"),
+                            "rear_port_position": i,
+                            "custom_fields": {"jumper_type": "SMF"},
+                        }
+                    )
+                if cat6:
                     for i in range(1, 7):
-                        cat6_trunk = self.nautobot.dcim.rear_ports.create(
-                            device=new_panel.id,
-                            name=f"Slot 4 Port {i} Rear",
-                            type="8p8c",
-                            positions=12,
-                            custom_fields={"jumper_type": "SMF"},
+                        tiers["rear_ports"].append(
+                            {
+                                "device": panel,
+                                "name": f"Slot 4 Port {i} Rear",
+                                "type": "8p8c",
+                                "positions": 12,
+                                "custom_fields": {"jumper_type": "SMF"},
+                            }
                         )
-                        self.nautobot.dcim.front_ports.create(
-                            device=new_panel.id,
-                            name=f"Slot 4 Port {i} Front",
-                            type="8p8c",
-                            rear_port=cat6_trunk.id,
-                            rear_port_position=1,
-                            custom_fields={"jumper_type": "CAT6"},
+                        tiers["front_ports"].append(
+                            {
+                                "device": panel,
+                                "name": f"Slot 4 Port {i} Front",
+                                "type": "8p8c",
+                                "rear_port": (panel, f"Slot 4 Port {i} Rear"),
+                                "rear_port_position": 1,
+                                "custom_fields": {"jumper_type": "CAT6"},
+                            }
                         )
 
             # relate panels and cassettes
-            self._relate_panels(self.new_panel_list)
-            self._relate_panels(cassette_list)
-            if c6_list:
-                self._relate_panels(c6_list)
+            tiers["relationships"].append({"source_id": hub, "destination_id": spoke})
+            for hub_slot, spoke_slot in zip(*slots):
+                tiers["relationships"].append(
+                    {"source_id": hub + hub_slot, "destination_id": spoke + spoke_slot}
+                )
 
-            self._create_trunk()
+            tiers["cables"].append(
+                {
+                    "type": "smf",
+                    "termination_a_type": "dcim.rearport",
+                    "termination_b_type": "dcim.rearport",
+                    "termination_a_id": (spoke, "Slot 1 Port 1 Rear"),
+                    "termination_b_id": (hub, "Slot 1 Port 1 Rear"),
+                    "status": "connected",
+                    "label": f"COM--{hub}--{spoke}--CXXXX",
+                }
+            )
+        return tiers
+
+    def plan(self, snapshot: dict) -> dict[str, dict[str, list]]:
+        """Split the build_panels objects per tier into 'create' and 'skip' (already in
+        the snapshot), so a re-run after a partial failure only creates what's missing.
+        A trunk is skipped when either rear port is already cabled.
+        """
+        devices = snapshot["devices"]
+        related = {tuple(i) for i in snapshot["relationships"]}
+
+        def exists(tier: str, obj: dict) -> bool:
+            if tier == "devices":
+                return obj["name"] in devices
+            if tier == "relationships":
+                return (obj["source_id"], obj["destination_id"]) in related
+            if tier == "cables":
+                trunks = (obj["termination_a_id"], obj["termination_b_id"])
+                return any(
+                    devices.get(device, {"rear_ports": {}})["rear_ports"]
+                    .get(port, {})
+                    .get("cable")
+                    for device, port in trunks
+                )
+            return obj["name"] in devices.get(obj["device"], {}).get(tier, [])
+
+        plan = {}
+        for tier, objects in self.build_panels().items():
+            plan[tier] = {"create": [], "skip": []}
+            for i in objects:
+                plan[tier]["skip" if exists(tier, i) else "create"].append(i)
+        return plan
+
+    @staticmethod
+    def print_plan(plan: dict[str, dict[str, list]], verbose: bool = True):
+        for tier, i in plan.items():
+            print(f"{tier:<14} create {len(i['create']):>4}  skip {len(i['skip']):>4}")
+        if not verbose:
+            return
+        for tier, i in plan.items():
+            for obj in i["create"]:
+                if tier == "devices":
+                    name = obj["name"]
+                elif tier == "relationships":
+                    name = f"{obj['source_id']} <-> {obj['destination_id']}"
+                elif tier == "cables":
+                    name = obj["label"]
+                else:
+                    name = f"{obj['device']} {obj['name']}"
+                print(f"+ {tier}: {name}")
+
+    def create_panels(self, snapshot: dict | None = None):
+        """Create the missing objects of every panel pair, one bulk create per object
+        type, tier by tier: devices -> device bays, rear ports -> front ports,
+        relationships -> cables. IDs returned by each tier, or already in the snapshot,
+        are resolved into the next.
+        """
+        snapshot = snapshot or self.fetch_snapshot()
+        plan = self.plan(snapshot)
+        self.print_plan(plan, verbose=False)
+        tiers = {tier: i["create"] for tier, i in plan.items()}
+
+        device_ids = {name: i["id"] for name, i in snapshot["devices"].items()}
+        rear_ids = {
+            (name, port): j["id"]
+            for name, i in snapshot["devices"].items()
+            for port, j in i["rear_ports"].items()
+        }
+
+        devices = self._bulk_create(
+            self.nautobot.dcim.devices,
+            [dict(i, tenant=self.tenant) for i in tiers["devices"]],
+        )
+        device_ids |= {i["name"]: j.id for i, j in zip(tiers["devices"], devices)}
+
+        self._bulk_create(
+            self.nautobot.dcim.device_bays,
+            [
+                dict(
+                    i,
+                    device=device_ids[i["device"]],
+                    installed_device=device_ids[i["installed_device"]],
+                )
+                for i in tiers["device_bays"]
+            ],
+        )
+
+        rear_ports = self._bulk_create(
+            self.nautobot.dcim.rear_ports,
+            [dict(i, device=device_ids[i["device"]]) for i in tiers["rear_ports"]],
+        )
+        rear_ids |= {
+            (i["device"], i["name"]): j.id
+            for i, j in zip(tiers["rear_ports"], rear_ports)
+        }
+
+        self._bulk_create(
+            self.nautobot.dcim.front_ports,
+            [
+                dict(
+                    i,
+                    device=device_ids[i["device"]],
+                    rear_port=rear_ids[i["rear_port"]],
+                )
+                for i in tiers["front_ports"]
+            ],
+        )
+
+        self._bulk_create(
+            self.nautobot.extras.relationship_associations,
+            [
+                self._relation(
+                    device_ids[i["source_id"]], device_ids[i["destination_id"]]
+                )
+                for i in tiers["relationships"]
+            ],
+        )
+
+        if not tiers["cables"]:
+            return
+        self.trunk_ids.reserve(len(tiers["cables"]))  # one trunk ID lookup for the run
+        cables = [
+            dict(
+                i,
+                termination_a_id=rear_ids[i["termination_a_id"]],
+                termination_b_id=rear_ids[i["termination_b_id"]],
+                label=i["label"].replace("CXXXX", self._next_cable_id()),
+            )
+            for i in tiers["cables"]
+        ]
+        try:
+            self._bulk_create(self.nautobot.dcim.cables, cables)
+        except RequestError:
+            for i in cables:
+                print(f"CREATE MANUALLY: {i['label']}")
 
 
 class Panels(Data):
@@ -343,9 +549,36 @@ def print_shipping():
     Panels().create_panels_shipment(render=False)
 
 
+@main.command()
+def plan_panels(
+    snapshot: str = typer.Option(
+        "", help="Site snapshot JSON, saved after fetching or read with --offline"
+    ),
+    offline: bool = typer.Option(False, help="Plan against --snapshot only"),
+):
+    """Print what create-panels would create and skip, no changes are made."""
+    if offline and not snapshot:
+        print("--offline needs a --snapshot to plan against")
+        raise typer.Exit(1)
+
+    panels = PanelsNautobot()
+    if offline:
+        with open(snapshot) as f:
+            site = json.load(f)
+        print(f"Snapshot of {site['site']} from {site['fetched']}")
+    else:
+        site = panels.fetch_snapshot()
+        if snapshot:
+            with open(snapshot, "w") as f:
+                json.dump(site, f, indent=2)
+    panels.print_plan(panels.plan(site))
+
+
 @main.command()
 def create_panels():
-    """Create all panels in Nautobot, similar to CreatePanels/Cassettes Job."""
+    """Create all panels in Nautobot, similar to CreatePanels/Cassettes Job.
+    Objects that already exist are skipped, see plan-panels.
+    """
     PanelsNautobot().create_panels()
 
 
@@ -0,0 +1,46 @@
+import re
+
+"""
+Trunk cable ID allocation, shared by nb_tools.py and panel_creations/panels_mops.py.
+"""
+
+TRUNK_LABEL = re.compile(r"--C([0-9]{4})$")
+
+
+class TrunkIdAllocator:
+    """Allocates trunk cable IDs, the 'C0123' suffix of 'COM--<device 1>--<device 2>--C0123'.
+
+    The last used ID comes from one GraphQL query returning only the labels of cables
+    containing '--C' (label__re doesn't work on nautobot-stage), instead of downloading
+    every cable. IDs are handed out from a locally reserved block, Nautobot is only
+    asked again once the block is used up.
+    """
+
+    QUERY = 'query { cables(label__ic: "--C") { label } }'
+
+    def __init__(self, nautobot, block_size: int = 10):
+        self.nautobot = nautobot
+        self.block_size = block_size
+        self.high_water = 0  # last ID handed out
+        self.reserved = 0  # last ID of the reserved block
+        self.lookups = 0
+
+    def last_used(self) -> int:
+        self.lookups += 1
+        cables = self.nautobot.graphql.query(query=self.QUERY).json["data"]["cables"]
+        labels = (TRUNK_LABEL.search(i["label"] or "") for i in cables)
+        return max((int(i.group(1)) for i in labels if i), default=0)
+
+    def reserve(self, count: int) -> None:
+        """Make sure the next count IDs are handed out without a lookup."""
+        if self.reserved - self.high_water < count:
+            self.high_water = max(self.high_water, self.last_used())
+            self.reserved = self.high_water + max(count, self.block_size)
+
+    def next_id(self) -> int:
+        self.reserve(1)
+        self.high_water += 1
+        return self.high_water
+
+    def label(self, device_1_name: str, device_2_name: str) -> str:
+        return f"COM--{device_1_name}--{device_2_name}--C{self.next_id():04d}"
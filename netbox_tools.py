@@ -1,7 +1,14 @@
 import csv
 import json
+import os
 import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
 from enum import Enum
+from typing import Any, Final, Iterable
 
 import keyring
 import pynetbox
@@ -9,12 +16,24 @@ import requests
 import typer
 import urllib3
 from pynautobot import api
+from requests.adapters import HTTPAdapter
 from rich import print
 from rich.prompt import Prompt, IntPrompt
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 app = typer.Typer(add_completion=False)
 
+BULK_CHUNK_SIZE: Final = 100  # objects per bulk (list) POST
+FILTER_CHUNK_SIZE: Final = 50  # values per filtered list GET, keeps the query string short
+
+DELETE_BATCH_SIZE: Final = 50  # objects in the first bulk DELETE, then adapted to response times
+DELETE_MAX_BATCH: Final = 1000
+DELETE_TARGET_SECONDS: Final = 10.0  # grow batches finishing under half of this, shrink above it
+DELETE_TIMEOUT: Final = DELETE_TARGET_SECONDS * 6  # client-side cap, a stalled bulk DELETE is treated as overload
+DELETE_WORKERS: Final = 3
+DELETE_RATES: Final = "delete_rates.json"  # objects/s seen per endpoint, for dry-run ETAs
+DEFAULT_DELETE_RATE: Final = 2.0  # objects/s before any run has been recorded, about one-by-one speed
+
 
 class PortType(str, Enum):
     rear = "rear"
@@ -54,6 +73,189 @@ def get_pynautobot() -> api:
     return api(url=url, token=token, verify=False)
 
 
+def prefetch(endpoint, field: str, values: Iterable[str], **filters) -> list:
+    """Return records whose field matches any of values, with one filtered list call per FILTER_CHUNK_SIZE values.
+    i.e. prefetch(nb.dcim.sites, "name", ["SITE1", "SITE2"])
+    """
+    values = sorted(set(filter(None, values)))
+    records = []
+    for i in range(0, len(values), FILTER_CHUNK_SIZE):
+        records.extend(endpoint.filter(**{field: values[i : i + FILTER_CHUNK_SIZE]}, **filters))
+    return records
+
+
+def lookup(index: dict, key, kind: str):
+    """index[key], with a readable error for the failures file."""
+    try:
+        value = index[key]
+    except KeyError:
+        raise ValueError(f"{kind} not found: {key}") from None
+    if value is None:
+        raise ValueError(f"more than one {kind} matches: {key}")
+    return value
+
+
+def bulk_errors(err: pynetbox.RequestError, count: int) -> list[str] | None:
+    """Per-object errors of a failed bulk create, '' for objects that were valid.
+    None if the response isn't a list of per-object errors, i.e. a 500.
+    """
+    try:
+        errors = err.req.json()
+    except ValueError:
+        return None
+    if not isinstance(errors, list) or len(errors) != count or not any(errors):
+        return None
+    return [json.dumps(i) if i else "" for i in errors]
+
+
+def bulk_create(endpoint, items: list[tuple[Any, dict]], chunk_size: int = BULK_CHUNK_SIZE):
+    """Create objects with bulk POSTs of chunk_size objects, items are (row, data) pairs.
+
+    NetBox rolls back a bulk create if any object fails, so failed objects are dropped and the rest
+    of the chunk resubmitted. If the errors can't be mapped to objects the chunk is created one by one.
+
+    Returns ([(row, record)], [(row, error)]).
+    """
+    created, failed = [], []
+    for i in range(0, len(items), chunk_size):
+        pending = items[i : i + chunk_size]
+        while pending:
+            try:
+                records = endpoint.create([data for _, data in pending])
+            except pynetbox.RequestError as err:
+                errors = bulk_errors(err, len(pending))
+                if errors is None:
+                    for row, data in pending:
+                        try:
+                            created.append((row, endpoint.create(data)))
+                        except pynetbox.RequestError as row_err:
+                            failed.append((row, row_err.error))
+                    break
+                failed.extend((item[0], error) for item, error in zip(pending, errors) if error)
+                pending = [item for item, error in zip(pending, errors) if not error]
+                continue
+            created.extend(zip((row for row, _ in pending), records))
+            break
+    return created, failed
+
+
+class TimeoutAdapter(HTTPAdapter):
+    """HTTPAdapter with a default timeout, for requests made without one (pynetbox never sets it)."""
+
+    def __init__(self, timeout: float, **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+
+class AdaptiveDelete:
+    """Bulk DELETE of object IDs on any endpoint, i.e. nb.dcim.cables, across a small worker pool.
+
+    Batches start at batch_size and double while requests finish well under DELETE_TARGET_SECONDS, a slow
+    response halves the batch size. A 5xx, connection error or timeout (DELETE_TIMEOUT, set on the session
+    while running) also halves it and lowers the ceiling batches can grow back to. Failed batches are requeued at the new size until single objects fail on their own (i.e. a
+    protected device). Retrying after a 504 is safe, NetBox ignores IDs that were already deleted.
+    """
+
+    def __init__(self, endpoint, ids: list[int], batch_size: int = DELETE_BATCH_SIZE):
+        self.endpoint = endpoint
+        self.pending = deque(ids)
+        self.size = batch_size
+        self.ceiling = DELETE_MAX_BATCH
+        self.deleted = 0
+        self.failed = []
+        self.lock = threading.Lock()
+
+    def _take(self) -> list[int]:
+        with self.lock:
+            return [self.pending.popleft() for _ in range(min(self.size, len(self.pending)))]
+
+    def _worker(self, total: int) -> None:
+        while batch := self._take():
+            start = time.perf_counter()
+            try:
+                self.endpoint.delete(batch)
+            except (pynetbox.RequestError, requests.RequestException) as err:
+                status = getattr(getattr(err, "req", None), "status_code", None)
+                overloaded = status in (502, 503, 504) or isinstance(err, (requests.Timeout, requests.ConnectionError))
+                with self.lock:
+                    if overloaded:
+                        self.ceiling = max(len(batch) * 3 // 4, 1)
+                    if len(batch) == 1:
+                        self.failed.append((batch[0], getattr(err, "error", str(err))))
+                    else:
+                        self.size = max(min(self.size, len(batch)) // 2, 1)
+                        self.pending.extendleft(reversed(batch))
+                        print(f"[yellow]{self.endpoint.name}: {err}, batch size {self.size}")
+                continue
+
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.deleted += len(batch)
+                if elapsed < DELETE_TARGET_SECONDS / 2:
+                    self.size = min(self.size * 2, self.ceiling)
+                elif elapsed > DELETE_TARGET_SECONDS:
+                    self.size = max(self.size // 2, 1)
+                print(
+                    f"{self.endpoint.name}: deleted {self.deleted} of {total} ({elapsed:.1f}s, next batch {self.size})"
+                )
+
+    def run(self, workers: int = DELETE_WORKERS) -> float:
+        """Delete everything, returns objects deleted per second."""
+        session = self.endpoint.api.http_session
+        adapters = dict(session.adapters)
+        for prefix in ("https://", "http://"):
+            session.mount(prefix, TimeoutAdapter(DELETE_TIMEOUT, pool_maxsize=max(workers, 10)))
+
+        total, start = len(self.pending), time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for future in [pool.submit(self._worker, total) for _ in range(workers)]:
+                    future.result()
+        finally:
+            session.adapters.clear()
+            session.adapters.update(adapters)
+        return self.deleted / max(time.perf_counter() - start, 1e-6)
+
+
+def bulk_delete(
+    endpoint, filters: dict, dry_run: bool = False, workers: int = DELETE_WORKERS, batch_size: int = DELETE_BATCH_SIZE
+) -> None:
+    """Delete every object on the endpoint matching filters with AdaptiveDelete.
+
+    Dry runs only list the objects and print the plan, with an ETA based on the rate of the last real run
+    against the endpoint. Failures are dumped to delete_failures.csv
+    """
+    ids = [i.id for i in endpoint.filter(brief=1, **filters)]
+    rates = {}
+    if os.path.exists(DELETE_RATES):
+        with open(DELETE_RATES, "r") as f:
+            rates = json.load(f)
+
+    if dry_run:
+        rate = rates.get(endpoint.name) or DEFAULT_DELETE_RATE
+        print(f"[green]Would delete {len(ids)} {endpoint.name} matching {filters or 'all'}")
+        print(f"{workers} workers, first batches of {batch_size}, max {DELETE_MAX_BATCH} objects per request")
+        print(f"ETA {timedelta(seconds=round(len(ids) / rate))} at {rate:.1f} objects/s")
+        return
+
+    deleter = AdaptiveDelete(endpoint, ids, batch_size)
+    rate = deleter.run(workers)
+    if deleter.deleted:  # nothing deleted says nothing about the rate
+        rates[endpoint.name] = rate
+        with open(DELETE_RATES, "w") as f:
+            json.dump(rates, f)
+
+    print(f"[green]Deleted {deleter.deleted} {endpoint.name}, {len(deleter.failed)} failed")
+    if deleter.failed:
+        with open("delete_failures.csv", "w") as f:
+            csv.writer(f).writerows(deleter.failed)
+
+
 @app.command()
 def post_asns() -> None:
     url, api_key = get_auth()
@@ -94,52 +296,74 @@ def post_asns() -> None:
 
 
 @app.command()
-def remove_all_devices() -> None:
-    """Remove all Devices in NetBox one-by-one to avoid 504s."""
+def remove_all_devices(
+    dry_run: bool = typer.Option(False, help="Only print the number of devices and an ETA"),
+    workers: int = typer.Option(DELETE_WORKERS, help="Concurrent delete requests"),
+) -> None:
+    """Remove all Devices in NetBox with adaptive bulk deletes, batches shrink instead of hitting 504s."""
     nb = get_pynb()
-    devices = nb.dcim.devices.all()  # can't bulk delete without a 504
-    for device in list(devices):
-        try:
-            device.delete()
-        except pynetbox.RequestError:
-            print(f"[red]Failed to delete {device}, re-attempt manually.")
+    bulk_delete(nb.dcim.devices, {}, dry_run, workers)
+
+
+@app.command()
+def delete_objects(
+    endpoint: str = typer.Argument(..., help="App and endpoint, i.e. dcim.cables"),
+    filters: list[str] = typer.Option([], "--filter", help="key=value NetBox filter, repeatable, i.e. site=lax"),
+    dry_run: bool = typer.Option(False, help="Only print the number of objects and an ETA"),
+    workers: int = typer.Option(DELETE_WORKERS, help="Concurrent delete requests"),
+    batch_size: int = typer.Option(DELETE_BATCH_SIZE, help="Objects in the first delete request"),
+) -> None:
+    """Delete all objects on any endpoint matching the filters with adaptive bulk deletes."""
+    nb = get_pynb()
+    app_name, endpoint_name = endpoint.split(".")
+    bulk_delete(
+        getattr(getattr(nb, app_name), endpoint_name),
+        dict(i.split("=", 1) for i in filters),
+        dry_run,
+        workers,
+        batch_size,
+    )
 
 
 @app.command()
 def bulk_add_ports(
-    port_type: PortType = typer.Argument(...), csv_file: str = typer.Argument(..., help="CSV input file")
+    port_type: PortType = typer.Argument(...),
+    csv_file: str = typer.Argument(..., help="CSV input file"),
+    rear_csv: str = typer.Option("", help="Front ports only: rear port CSV to create first, in the same run"),
+    chunk_size: int = typer.Option(BULK_CHUNK_SIZE, help="Ports per bulk create request"),
 ) -> None:
-    def add_rp(rp: list[str]) -> None:
-        device = nb.dcim.devices.get(name=rp[0])
-        data = {
-            "device": device.id,
+    """Create rear ports, front ports or interfaces from a CSV file. Failures are dumped to failures.csv
+
+    Devices, and for front ports their existing rear ports, are fetched with one filtered list call per
+    batch of devices, then ports are created with bulk POSTs. Rear ports created from --rear-csv are
+    added to the index, so front ports referencing them need no extra lookups.
+    """
+
+    def rp_data(rp: list[str]) -> dict:
+        return {
+            "device": lookup(devices, rp[0], "device").id,
             "name": rp[1],
             "label": rp[2],
             "type": rp[3].lower(),
             "positions": rp[4],
             "description": rp[5],
-            "custon_fields": {"jumper_type": rp[6]},
+            "custom_fields": {"jumper_type": rp[6]},
         }
-        port = nb.dcim.rear_ports.create(**data)
-        port.save()
 
-    def add_fp(fp: list[str]) -> None:
-        device = nb.dcim.devices.get(name=fp[0])
-        rp = nb.dcim.rear_ports.get(device=device.name, name=fp[4])
-        data = {
+    def fp_data(fp: list[str]) -> dict:
+        device = lookup(devices, fp[0], "device")
+        return {
             "device": device.id,
             "name": fp[1],
             "label": fp[2],
             "type": fp[3].lower(),
-            "rear_port": rp.id,
+            "rear_port": lookup(rear_ports, (device.id, fp[4]), "rear port"),
             "rear_port_position": fp[5],
             "description": fp[6],
-            "custon_fields": {"jumper_type": fp[7]},
+            "custom_fields": {"jumper_type": fp[7]},
         }
-        port = nb.dcim.front_ports.create(**data)
-        port.save()
 
-    def add_iface(iface: list[str]) -> None:
+    def iface_data(iface: list[str]) -> dict:
         type_inputs = {
             "QSFP28 (100GE)": "100gbase-x-qsfp28",
             "Other": "other",
@@ -152,35 +376,61 @@ def bulk_add_ports(
             "OC-192/STM-64": "sonet-oc192",
             "GBIC (1GE)": "1000base-x-gbic",
         }
-        device = nb.dcim.devices.get(name=iface[0])
-        data = {
-            "device": device.id,
+        return {
+            "device": lookup(devices, iface[0], "device").id,
             "name": iface[1],
             "label": iface[2],
-            "type": type_inputs[iface[4]],
+            "type": lookup(type_inputs, iface[4], "interface type"),
             "description": iface[9],
         }
-        iface = nb.dcim.interfaces.create(**data)
-        iface.save()
 
-    nb = get_pynb()
-    failures = []
-    with open(csv_file, "r") as f:
-        ports = csv.reader(f)
+    def read_ports(filename: str) -> list[list[str]]:
+        """CSV rows without the header, grouped by device so each bulk request touches few devices."""
+        with open(filename, "r") as f:
+            ports = [port for port in csv.reader(f) if port and port[0] != "device"]
+        return sorted(ports, key=lambda port: port[0])
+
+    def import_ports(ports: list[list[str]], endpoint, build) -> list:
+        to_create = []
         for port in ports:
-            if port[0] == "device":
-                continue
             try:
-                match port_type.value:
-                    case "rear":
-                        add_rp(port)
-                    case "front":
-                        add_fp(port)
-                    case "iface":
-                        add_iface(port)
-            except Exception as err:
-                port.append(str(err))
-                failures.append(port)
+                to_create.append((port, build(port)))
+            except (IndexError, ValueError) as err:
+                failures.append(port + [str(err)])
+
+        created, failed = bulk_create(endpoint, to_create, chunk_size)
+        failures.extend(port + [error] for port, error in failed)
+        print(f"Created {len(created)} of {len(ports)} ports ({endpoint.name})")
+        return created
+
+    if rear_csv and port_type is not PortType.front:
+        print("[red]--rear-csv is only used when importing front ports")
+        raise typer.Exit(1)
+
+    nb = get_pynb()
+    failures = []
+    ports = read_ports(csv_file)
+    rear = read_ports(rear_csv) if rear_csv else []
+
+    # names are only unique per site/tenant, ports for a duplicated name fail with "more than one device"
+    devices = {}
+    for i in prefetch(nb.dcim.devices, "name", (port[0] for port in ports + rear)):
+        devices[i.name] = None if i.name in devices else i
+    rear_ports = {}
+    if port_type is PortType.front:
+        device_ids = [i.id for i in devices.values() if i]
+        for i in prefetch(nb.dcim.rear_ports, "device_id", device_ids):
+            rear_ports[(i.device.id, i.name)] = i.id
+        for port, record in import_ports(rear, nb.dcim.rear_ports, rp_data):
+            rear_ports[(devices[port[0]].id, port[1])] = record.id
+
+    match port_type.value:
+        case "rear":
+            import_ports(ports, nb.dcim.rear_ports, rp_data)
+        case "front":
+            import_ports(ports, nb.dcim.front_ports, fp_data)
+        case "iface":
+            import_ports(ports, nb.dcim.interfaces, iface_data)
 
     with open("failures.csv", "w") as f:
         write = csv.writer(f)
@@ -188,40 +438,71 @@ def bulk_add_ports(
 
 
 @app.command()
-def migrate_cables():
-    def create_cable(cable: dict) -> None:
-        def find_netbox_port(term_type: str, term: dict):
-            if term_type == "dcim.powerfeed":
-                data = {"name": term["name"]}
-            elif term_type == "circuits.circuittermination":
-                circuit = netbox.circuits.circuits.get(cid=term["circuit"]["cid"])
-                data = {"circuit_id": circuit.id, "term_side": term["term_side"]}
-            else:
-                site = nautobot.dcim.devices.get(id=term["device"]["id"]).site.slug
-                data = {"device": term["device"]["name"], "name": term["name"], "site": site}
-            match term_type:
-                case "dcim.rearport":
-                    return netbox.dcim.rear_ports.get(**data)
-                case "dcim.frontport":
-                    return netbox.dcim.front_ports.get(**data)
-                case "dcim.interface":
-                    return netbox.dcim.interfaces.get(**data)
-                case "dcim.powerport":
-                    return netbox.dcim.power_ports.get(**data)
-                case "dcim.powerfeed":
-                    return netbox.dcim.power_feeds.get(**data)
-                case "dcim.poweroutlet":
-                    return netbox.dcim.power_outlets.get(**data)
-                case "circuits.circuittermination":
-                    return netbox.circuits.circuit_terminations.get(**data)
-                case _:
-                    raise ValueError(f"Invalid term type: {term_type}")
+def migrate_cables(
+    input_file: str = typer.Option("circuit_terms.json", help="Nautobot cables as JSON"),
+    checkpoint: str = typer.Option("migrate_cables.done", help="Completed Nautobot cable IDs, delete to start over"),
+    workers: int = typer.Option(4, help="Concurrent bulk create requests"),
+    chunk_size: int = typer.Option(BULK_CHUNK_SIZE, help="Cables per bulk create request"),
+):
+    """Create Nautobot cables in NetBox. Failures are dumped to failures.json
+
+    Terminations are resolved against indexes built up front (Nautobot device -> site, NetBox
+    (site, device) -> id, (device, port) -> id per port type, circuits and power feeds), then cables are
+    created in concurrent bulk batches. Completed cable IDs are appended to the checkpoint file after each
+    batch, so an interrupted run skips them when restarted.
+    """
+    port_endpoints = {
+        "dcim.rearport": "rear_ports",
+        "dcim.frontport": "front_ports",
+        "dcim.interface": "interfaces",
+        "dcim.powerport": "power_ports",
+        "dcim.poweroutlet": "power_outlets",
+    }
 
+    def build_indexes(cables: list[dict]) -> None:
+        terms = [(c[f"termination_{side}_type"], c[f"termination_{side}"]) for c in cables for side in "ab"]
+        device_terms = [(term_type, term) for term_type, term in terms if term_type in port_endpoints]
+
+        device_ids = (term["device"]["id"] for _, term in device_terms)
+        site_of.update({i.id: i.site.slug for i in prefetch(nautobot.dcim.devices, "id", device_ids)})
+        for i in prefetch(netbox.dcim.devices, "name", (term["device"]["name"] for _, term in device_terms)):
+            nb_devices[(i.site.slug, i.name)] = i.id
+
+        for term_type, endpoint in port_endpoints.items():
+            names = {term["device"]["name"] for i, term in device_terms if i == term_type}
+            device_ids = [device_id for (_, name), device_id in nb_devices.items() if name in names]
+            for i in prefetch(getattr(netbox.dcim, endpoint), "device_id", device_ids):
+                ports[(term_type, i.device.id, i.name)] = i.id
+
+        cids = (term["circuit"]["cid"] for term_type, term in terms if term_type == "circuits.circuittermination")
+        circuits.update({i.cid: i.id for i in prefetch(netbox.circuits.circuits, "cid", cids)})
+        for i in prefetch(netbox.circuits.circuit_terminations, "circuit_id", circuits.values()):
+            circuit_terms[(i.circuit.id, i.term_side)] = i.id
+
+        for i in prefetch(
+            netbox.dcim.power_feeds, "name", (term["name"] for t, term in terms if t == "dcim.powerfeed")
+        ):
+            power_feeds[i.name] = None if i.name in power_feeds else i.id
+
+    def find_netbox_port(term_type: str, term: dict) -> int:
+        if term_type == "dcim.powerfeed":
+            return lookup(power_feeds, term["name"], "power feed")
+        elif term_type == "circuits.circuittermination":
+            circuit = lookup(circuits, term["circuit"]["cid"], "circuit")
+            return lookup(circuit_terms, (circuit, term["term_side"]), "circuit termination")
+        elif term_type not in port_endpoints:
+            raise ValueError(f"Invalid term type: {term_type}")
+
+        site = lookup(site_of, term["device"]["id"], "Nautobot device")
+        device = lookup(nb_devices, (site, term["device"]["name"]), "device")
+        return lookup(ports, (term_type, device, term["name"]), term_type)
+
+    def cable_data(cable: dict) -> dict:
         a_port = find_netbox_port(cable["termination_a_type"], cable["termination_a"])
         b_port = find_netbox_port(cable["termination_b_type"], cable["termination_b"])
         data = {
-            "a_terminations": [{"object_id": a_port.id, "object_type": cable["termination_a_type"]}],
-            "b_terminations": [{"object_id": b_port.id, "object_type": cable["termination_b_type"]}],
+            "a_terminations": [{"object_id": a_port, "object_type": cable["termination_a_type"]}],
+            "b_terminations": [{"object_id": b_port, "object_type": cable["termination_b_type"]}],
             "status": cable["status"]["value"],
             "label": cable["label"],
             "length": cable["length"],
@@ -229,30 +510,46 @@ def migrate_cables():
         }
         if re.match(r"COM--.*--C\d+", cable["label"]):
             data.update(tags=[mod_tag.id])
-
-        c = netbox.dcim.cables.create(**data)
-        c.save()
+        return data
 
     nautobot = get_pynautobot()
     netbox = get_pynb()
     mod_tag = list(netbox.extras.tags.all())[0]  # modular tag is the only one
 
     failures = []
+    site_of, nb_devices, ports, circuits, circuit_terms, power_feeds = {}, {}, {}, {}, {}, {}
 
     # all_cables = nautobot.dcim.cables.all()
     # with open("failures.json", "r") as f:
     #     all_cables = json.load(f)
-    with open("circuit_terms.json", "r") as f:
+    with open(input_file, "r") as f:
         all_cables = json.load(f)
 
-    print(len(all_cables))
-    for cable in all_cables:
+    done = set()
+    if os.path.exists(checkpoint):
+        with open(checkpoint, "r") as f:
+            done = set(f.read().split())
+    cables = [cable for cable in all_cables if cable["id"] not in done]
+    print(f"{len(all_cables)} cables, {len(all_cables) - len(cables)} already migrated")
+
+    build_indexes(cables)
+    to_create = []
+    for cable in cables:
         try:
-            create_cable(cable)
-        except Exception as err:
-            cable = dict(cable)
-            cable.update({"error": str(err)})
-            failures.append(cable)
+            to_create.append((cable, cable_data(cable)))
+        except (KeyError, TypeError, ValueError) as err:
+            failures.append(dict(cable, error=str(err)))
+
+    batches = [to_create[i : i + chunk_size] for i in range(0, len(to_create), chunk_size)]
+    with ThreadPoolExecutor(max_workers=workers) as pool, open(checkpoint, "a") as done_file:
+        futures = [pool.submit(bulk_create, netbox.dcim.cables, batch, chunk_size) for batch in batches]
+        for future in as_completed(futures):
+            created, failed = future.result()
+            done_file.writelines(f"{cable['id']}\n" for cable, _ in created)
+            done_file.flush()
+            failures.extend(dict(cable, error=error) for cable, error in failed)
+            done.update(cable["id"] for cable, _ in created)
+            print(f"migrated {len(done)} of {len(all_cables)} cables")
 
     print(len(failures))
     with open("failures.json", "w") as f:
@@ -260,15 +557,41 @@ def migrate_cables():
 
 
 @app.command()
-def bulk_add_devices() -> None:
-    """Create new devices in NetBox from a CSV file. Failures are dumped to a new csv for analysis"""
-
-    def add_device(device: list[list[str]]) -> None:
-        site = nb.dcim.sites.get(name=device[9])
+def bulk_add_devices(
+    filename: str = typer.Option("devices.csv", help="CSV input file"),
+    chunk_size: int = typer.Option(BULK_CHUNK_SIZE, help="Devices per bulk create request"),
+) -> None:
+    """Create new devices in NetBox from a CSV file. Failures are dumped to a new csv for analysis
+
+    Every site, role, device type, tenant, location and rack in the CSV is resolved up front with
+    filtered list calls, then devices are created with bulk POSTs of chunk_size devices.
+    """
+
+    def build_indexes(devices: list[list[str]]) -> None:
+        sites.update({i.name: i for i in prefetch(nb.dcim.sites, "name", (d[9] for d in devices))})
+        site_ids = [i.id for i in sites.values()]
+        roles.update({i.name: i.id for i in prefetch(nb.dcim.device_roles, "name", (d[1] for d in devices))})
+        for i in prefetch(nb.dcim.device_types, "model", (d[4] for d in devices)):
+            # model is only unique per manufacturer
+            device_types[i.model] = None if i.model in device_types else i.id
+        tenants.update({i.name: i.id for i in prefetch(nb.tenancy.tenants, "name", (d[2] for d in devices))})
+        if not site_ids:
+            return
+
+        for i in prefetch(nb.dcim.locations, "name", (d[10] for d in devices), site_id=site_ids):
+            locations[(i.site.id, i.name)] = i.id
+        for i in prefetch(nb.dcim.racks, "name", (d[11] for d in devices), site_id=site_ids):
+            racks[("location", i.location.id if i.location else None, i.name)] = i.id
+            # rack names are only unique per location, flag duplicates within a site
+            key = ("site", i.site.id, i.name)
+            racks[key] = None if key in racks else i.id
+
+    def device_data(device: list[str]) -> dict:
+        site = lookup(sites, device[9], "site")
         data = {
             "name": device[0],
-            "role": nb.dcim.device_roles.get(name=device[1]).id,
-            "device_type": nb.dcim.device_types.get(model=device[4]).id,
+            "role": lookup(roles, device[1], "role"),
+            "device_type": lookup(device_types, device[4], "device type"),
             "status": device[8].lower(),
             "site": site.id,
             "position": device[12],
@@ -282,53 +605,55 @@ def bulk_add_devices() -> None:
         }
         tenant_str = device[2]
         if tenant_str:
-            data.update({"tenant": nb.tenancy.tenants.get(name=tenant_str).id})
+            data.update({"tenant": lookup(tenants, tenant_str, "tenant")})
 
         location_str = device[10]
         if location_str:
-            location = nb.dcim.locations.get(name=location_str, site=site.slug)
-            data.update({"rack": nb.dcim.racks.get(name=device[11], location=location.slug).id})
+            location = lookup(locations, (site.id, location_str), "location")
+            data.update({"rack": lookup(racks, ("location", location, device[11]), "rack")})
         else:
-            data.update({"rack": nb.dcim.racks.get(name=device[11], site=site.slug).id})
-
-        _ = nb.dcim.devices.create(**data)
+            data.update({"rack": lookup(racks, ("site", site.id, device[11]), "rack")})
+        return data
 
-    filename = "devices.csv"
     failure_file = "failures.csv"
     failed_devices = []
+    sites, roles, device_types, tenants, locations, racks = {}, {}, {}, {}, {}, {}
 
     nb = get_pynb()
     try:
         with open(filename) as f:
-            devices = csv.reader(f)
-            print("[green]Adding devices...")
-            for device in devices:
-                if device[0] == "name":  # header row
-                    device.append("FAILURE REASON")
-                    failed_devices.append(device)
-                    continue
-
-                try:
-                    add_device(device)
-                except pynetbox.RequestError as err:
-                    if "already occupied" in err.error:
-                        continue
-                    else:
-                        device.append(err.error)
-                        failed_devices.append(device)
-                        print(f"[bold red]Failed to upload {device[0]}, re-attempt manually.")
-                except (IndexError, AttributeError, ValueError):
-                    failed_devices.append(device)
-                    print(f"[bold red]Failed to upload {device[0]}, re-attempt manually.")
-
+            devices = list(csv.reader(f))
     except FileNotFoundError:
         print(f"[bold red]Unable to find file: [white]{filename}")
+        return
+
+    if devices and devices[0][0] == "name":  # header row
+        failed_devices.append(devices.pop(0) + ["FAILURE REASON"])
+
+    print("[green]Resolving sites, roles, device types, tenants, locations and racks...")
+    build_indexes(devices)
+
+    to_create = []
+    for device in devices:
+        try:
+            to_create.append((device, device_data(device)))
+        except (IndexError, ValueError) as err:
+            failed_devices.append(device + [str(err)])
+            print(f"[bold red]Failed to upload {device[0]}, re-attempt manually.")
+
+    print(f"[green]Adding {len(to_create)} devices...")
+    created, failed = bulk_create(nb.dcim.devices, to_create, chunk_size)
+    for device, error in failed:
+        if "already occupied" in error:
+            continue
+        failed_devices.append(device + [error])
+        print(f"[bold red]Failed to upload {device[0]}, re-attempt manually.")
 
     with open(failure_file, "w") as f:
         write = csv.writer(f)
         write.writerows(failed_devices)
 
-    print("[green]Program finished!")
+    print(f"[green]Program finished! Created {len(created)} devices.")
 
 
 @app.command()
@@ -409,34 +734,45 @@ def make_c1100_conn(
 def make_simplex_ports(
     panel_name: str = typer.Argument(..., help="Panel name"),
     port_count: int = typer.Argument(..., help="Number of ports"),
+    per_port: bool = typer.Option(False, help="Create each port with its own request, for timing comparison"),
 ):
+    """Create simplex rear/front port pairs on a panel, i.e. 'Ports 1,2 Rear' and 'Ports 1,2 Front'.
+
+    All rear ports are created in one bulk POST, then all front ports in a second one using the returned
+    rear port IDs.
+    """
     netbox = get_pynb()
     device = netbox.dcim.devices.get(name=panel_name)
-
-    j = 0
-    for i in range(port_count):
-        i = j + 1
-        j = i + 1
-
-        rp = netbox.dcim.rear_ports.create(
-            device=device.id,
-            name=f"Ports {i},{j} Rear",
-            type="sc",
-            positions=1,
-            custom_fields={"jumper_type": "SMF"},
+    pairs = [(i, i + 1) for i in range(1, port_count * 2, 2)]
+    port_data = {"device": device.id, "type": "sc", "custom_fields": {"jumper_type": "SMF"}}
+
+    start = time.perf_counter()
+    if per_port:
+        for i, j in pairs:
+            rp = netbox.dcim.rear_ports.create(name=f"Ports {i},{j} Rear", positions=1, **port_data)
+            netbox.dcim.front_ports.create(
+                name=f"Ports {i},{j} Front", rear_port=rp.id, rear_port_position=1, **port_data
+            )
+            print(f"Created port {i},{j}")
+    else:
+        rear_ports = netbox.dcim.rear_ports.create(
+            [{"name": f"Ports {i},{j} Rear", "positions": 1, **port_data} for i, j in pairs]
         )
-        rp.save()
-        fp = netbox.dcim.front_ports.create(
-            device=device.id,
-            name=f"Ports {i},{j} Front",
-            type="sc",
-            rear_port=rp.id,
-            rear_port_position=1,
-            custom_fields={"jumper_type": "SMF"},
+        rear_ids = {rp.name: rp.id for rp in rear_ports}
+        netbox.dcim.front_ports.create(
+            [
+                {
+                    "name": f"Ports {i},{j} Front",
+                    "rear_port": rear_ids[f"Ports {i},{j} Rear"],
+                    "rear_port_position": 1,
+                    **port_data,
+                }
+                for i, j in pairs
+            ]
         )
-        fp.save()
 
-        print(f"Created port {i},{j}")
+    requests_made = len(pairs) * 2 if per_port else 2
+    print(f"Created {len(pairs)} port pairs with {requests_made} requests in {time.perf_counter() - start:.1f}s")
 
 
 @app.command()
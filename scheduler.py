@@ -0,0 +1,97 @@
+import asyncio
+import threading
+import time
+import traceback
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Callable
+
+"""
+Concurrent runner for the scheduled report jobs.
+
+Jobs are blocking functions run on threads via asyncio. Rate limits are applied per service
+rather than per job: a ServiceLimiter wraps the request method of a shared client's HTTP
+object so that, e.g., every job's Jira calls share one Jira concurrency cap. Requests are
+counted against the job that made them, including calls made from JiraTools worker threads
+(see tools.submit).
+"""
+
+current_job: ContextVar["JobResult | None"] = ContextVar("current_job", default=None)
+
+
+@dataclass
+class JobResult:
+    name: str
+    duration: float = 0.0
+    requests: Counter = field(default_factory=Counter)
+    error: str = ""
+    traceback: str = ""
+
+
+class ServiceLimiter:
+    """Caps concurrent HTTP requests to a service and counts them per job."""
+
+    def __init__(self, service: str, limit: int):
+        self.service = service
+        self.semaphore = threading.BoundedSemaphore(limit)
+        self._installed = set()
+
+    def install(self, http) -> None:
+        """Wrap http.request, i.e. a requests.Session or the httplib2/AuthorizedHttp object of a Google service.
+        Objects shared between clients are only wrapped once.
+        """
+        if id(http) in self._installed:
+            return
+        self._installed.add(id(http))
+        request = http.request
+
+        @wraps(request)
+        def limited(*args, **kwargs):
+            if job := current_job.get():
+                job.requests[self.service] += 1
+            with self.semaphore:
+                return request(*args, **kwargs)
+
+        http.request = limited
+
+
+def _run_job(name: str, job: Callable) -> JobResult:
+    result = JobResult(name)
+    current_job.set(result)
+    start = time.perf_counter()
+    try:
+        job()
+    except Exception as err:  # one failed report shouldn't stop the rest of the batch
+        result.error = f"{type(err).__name__}: {err}"
+        result.traceback = traceback.format_exc()
+    result.duration = time.perf_counter() - start
+    return result
+
+
+async def _run_all(jobs: dict[str, Callable]) -> list[JobResult]:
+    # to_thread copies the context, so each job sets current_job in its own copy
+    return await asyncio.gather(*(asyncio.to_thread(_run_job, name, job) for name, job in jobs.items()))
+
+
+def run_jobs(jobs: dict[str, Callable]) -> list[JobResult]:
+    """Run all jobs concurrently and print a summary of duration and requests per service,
+    followed by the traceback of each failed job.
+    """
+    start = time.perf_counter()
+    results = asyncio.run(_run_all(jobs))
+    elapsed = time.perf_counter() - start
+
+    print(f"\n{'job':<20} {'status':<8} {'seconds':>8}  requests")
+    for i in results:
+        requests = ", ".join(f"{service}={count}" for service, count in sorted(i.requests.items())) or "-"
+        print(f"{i.name:<20} {'FAILED' if i.error else 'ok':<8} {i.duration:>8.1f}  {requests}")
+        if i.error:
+            print(f"{'':<20} {i.error}")
+    print(f"\nfinished {len(results)} jobs in {elapsed:.1f}s (serial total {sum(i.duration for i in results):.1f}s)")
+
+    for i in results:
+        if i.error:
+            print(f"\n{i.name} failed:\n{i.traceback}")
+    return results
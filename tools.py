@@ -1,18 +1,28 @@
 import re
-from datetime import date, datetime, timedelta
-from pathlib import Path
-from typing import Final
+import time
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from contextvars import copy_context
+from datetime import date, datetime, timedelta, timezone
+from itertools import islice
+from typing import TYPE_CHECKING, Final, Iterable, Iterator
 
-import keyring
 import numpy as np
 import pandas as pd
-import pygsheets
-import requests
-from atlassian import Confluence, Jira
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+
+from clients import (
+    CREDENTIALS_DIR,
+    atlassian_credentials,
+    confluence_client,
+    google_credentials,
+    google_service,
+    gsheets_client,
+    jira_client,
+)
+from calendar_store import EventStore, parse_rfc3339
+from jira_cache import IssueCache
+
+if TYPE_CHECKING:
+    import pygsheets
 
 """
 Tools for Jira, Confluence, and Google Calendar.
@@ -23,7 +33,50 @@ START_DATE: Final = "customfield_10410"
 END_DATE: Final = "customfield_10411"
 JUSTIFICATION: Final = "customfield_11102"
 SEGMENT: Final = "customfield_11004"
-CREDENTIALS_DIR: Final = Path("~/Google Drive/My Drive/Scripts").expanduser()
+
+JQL_CHUNK_SIZE: Final = 50  # keys per 'key in (...)' query
+JIRA_WORKERS: Final = 4  # concurrent Jira requests
+JQL_PAGE_SIZE: Final = 500  # maxResults per search page, the server may return fewer
+GMAIL_BATCH_SIZE: Final = 100  # max calls per Gmail batch request
+# partial response for RH emails, just enough to decode the body
+GMAIL_MESSAGE_FIELDS: Final = "id,internalDate,snippet,payload(mimeType,body/data,parts)"
+GMAIL_RETRY_STATUS: Final = {429, 500, 502, 503, 504}  # batch sub-request errors worth retrying
+JIRA_CACHE: Final = CREDENTIALS_DIR.joinpath("jira_cache.sqlite")
+
+CALENDAR_TZ: Final = "America/Los_Angeles"  # weekly report times, whatever offset an event was created with
+CALENDAR_STORE: Final = CREDENTIALS_DIR.joinpath("calendar_store.sqlite")
+CALENDAR_PAGE_SIZE: Final = 2500  # max events per events().list page
+CALENDAR_SYNC_DAYS: Final = 400  # history pulled by a full sync, later syncs only pull changes
+# partial response, the fields reports use plus status for deleted events
+CALENDAR_EVENT_FIELDS: Final = (
+    "nextPageToken,nextSyncToken,items(id,status,summary,description,creator/email,start,end)"
+)
+# start/end are dateTime for timed events and date for all-day events, the other is missing
+EVENT_COLUMNS: Final = [
+    "summary",
+    "creator.email",
+    "description",
+    "start.dateTime",
+    "start.date",
+    "end.dateTime",
+    "end.date",
+]
+EVENT_TICKET: Final = r"((?:NOC|COR|SYS|ISO)-[0-9]{3,7})"
+JIRA_BROWSE_URL: Final = "https://servicedesk.cenic.org/browse/"
+EVENTS_REPORT_COLUMNS: Final = [
+    "ticket",
+    "creator",
+    "assignee",
+    "reporter",
+    "ticket_sum",
+    "summary",
+    "calendar",
+    "start_date",
+    "start_time",
+    "end_time",
+    "description",
+    "last_comment",
+]
 
 DEP_FY_FIELD: Final = "customfield_11003"
 DEP_A_LOC: Final = "customfield_11000"
@@ -53,189 +106,380 @@ def get_last_comment(comments: list) -> str:
         return ""
 
 
+def jira_timestamp(value: str) -> float:
+    """Convert Jira datetime string, i.e. '2023-05-01T13:45:12.000-0700', to epoch time."""
+    return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%f%z").timestamp()
+
+
+def sort_by_engineer(df: pd.DataFrame, column: str, engineers: list) -> pd.DataFrame:
+    """Stable sort of DF rows into the given engineer order, as if it had been pulled per engineer."""
+    order = {name: i for i, name in enumerate(engineers)}
+    return df.sort_values(column, key=lambda x: x.map(order), kind="stable", ignore_index=True)
+
+
+def chunked(items: Iterable, size: int) -> Iterator[list]:
+    """Yield successive lists of items, each at most size long. Consumes lazily from generators."""
+    items = iter(items)
+    while chunk := list(islice(items, size)):
+        yield chunk
+
+
+def issues_frame(issues: Iterable[dict], columns: list[str], chunk_size: int = JQL_PAGE_SIZE) -> pd.DataFrame:
+    """Build a DF from an iterable of Jira issues, normalizing chunk by chunk and keeping only the
+    given columns, so the raw issue JSON for a large search is never held in memory at once.
+    """
+    frames = [pd.json_normalize(chunk).filter(columns) for chunk in chunked(issues, chunk_size)]
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _local_datetimes(values: pd.Series, tz: str) -> pd.Series:
+    """'YYYY-MM-DD HH:MM:SS' strings in tz from RFC3339 strings with any offset, NaN where missing.
+    Slicing these is much faster than a .dt.strftime per output column.
+    """
+    local = pd.to_datetime(values, utc=True, format="ISO8601").dt.tz_convert(tz).dt.tz_localize(None)
+    return local.astype(str).where(local.notna())
+
+
+def shape_events(events: pd.DataFrame, tz: str = CALENDAR_TZ) -> pd.DataFrame:
+    """Normalize raw calendar events (EVENT_COLUMNS plus 'calendar') for the weekly report.
+
+    Timed events are converted to tz and split into start_date/start_time/end_time, all-day events
+    keep their start.date and get blank times. 'ticket' is the Jira key found in the summary, NaN if none.
+    """
+    events = events.reset_index(drop=True)
+    summary = events["summary"].fillna("").astype(str)
+    start = _local_datetimes(events["start.dateTime"], tz)
+    end = _local_datetimes(events["end.dateTime"], tz)
+
+    df = pd.DataFrame(
+        {
+            "summary": summary.mask(summary.str.match(r"\d"), "NOC-" + summary),  # summary is just a NOC number
+            "creator": events["creator.email"].fillna("").astype(str).str.removesuffix("@cenic.org"),
+            "calendar": events["calendar"],
+            "start_date": start.str[:10].fillna(events["start.date"]),
+            "start_time": start.str[11:19].fillna(""),
+            "end_time": end.str[11:19].fillna(""),
+            "description": events["description"],
+        }
+    )
+    df["ticket"] = df["summary"].str.extract(EVENT_TICKET, expand=False)
+    return df
+
+
+def events_report(events: pd.DataFrame, ticket_data: pd.DataFrame) -> pd.DataFrame:
+    """Weekly report rows from shape_events() output and events_jira_outputs() data.
+    Events without a (known) ticket get blank Jira columns and no link.
+    """
+    df = events.join(ticket_data.set_axis(ticket_data.index.astype(str)), on="ticket")  # empty DFs have an int index
+    df[list(ticket_data.columns)] = df[list(ticket_data.columns)].fillna("")
+    df["ticket"] = (f'=HYPERLINK("{JIRA_BROWSE_URL}' + df["ticket"] + '", "' + df["ticket"] + '")').fillna("")
+    return df[EVENTS_REPORT_COLUMNS]
+
+
+def submit(pool: Executor, func, *args, **kwargs) -> Future:
+    """pool.submit() that runs func in a copy of the caller's context, so per-job request accounting
+    (see scheduler.py) follows the work onto worker threads.
+    """
+    return pool.submit(copy_context().run, func, *args, **kwargs)
+
+
 def open_gsheet(sheet_title: str, workbook_title: str):
     """Open Google Sheet via pygsheets and return Sheet object."""
-    client = pygsheets.authorize(credentials_directory=CREDENTIALS_DIR, local=True)
-    return client.open(sheet_title).worksheet_by_title(workbook_title)
+    return gsheets_client().open(sheet_title).worksheet_by_title(workbook_title)
+
+
+def _cell_key(value) -> str:
+    """Normalize a cell for diffing, numbers compare by value so '8.0' matches a sheet value of 8."""
+    try:
+        return repr(float(value))
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def sync_dataframe(
+    sheet: "pygsheets.Worksheet", df: pd.DataFrame, start: tuple | str = (1, 1), copy_head: bool = True, nan: str = ""
+) -> tuple[int, int]:
+    """Diff-based replacement for sheet.clear(start) + sheet.set_dataframe(df, start).
+
+    Current values from start to the end of the sheet are read once (as formulas, so HYPERLINK cells compare
+    equal), and only the cells that differ are sent as ranged writes in a single batchUpdate. Cells left over
+    from a longer/wider previous DF are blanked, as clear() would have done.
+
+    Returns (written, skipped) cell counts.
+    """
+    import pygsheets
+
+    start = pygsheets.Address(start)
+    new = df.astype(object).where(pd.notna(df), nan).astype(str).values.tolist()
+    if copy_head:
+        new.insert(0, [str(i) for i in df.columns])
+
+    current = sheet.get_values(
+        (start.row, start.col),
+        (sheet.rows, sheet.cols),
+        returnas="matrix",
+        include_tailing_empty=False,
+        include_tailing_empty_rows=False,
+        value_render=pygsheets.ValueRenderOption.FORMULA,
+        date_time_render_option=pygsheets.DateTimeRenderOption.FORMATTED_STRING,
+    )
+
+    # grow the sheet if the DF no longer fits, same as set_dataframe(extend=True)
+    if start.row + len(new) - 1 > sheet.rows:
+        sheet.rows = start.row + len(new) - 1
+    if new and start.col + len(new[0]) - 1 > sheet.cols:
+        sheet.cols = start.col + len(new[0]) - 1
+
+    ranges, values = [], []
+    written = skipped = 0
+    for r in range(max(len(new), len(current))):
+        new_row = new[r] if r < len(new) else []
+        cur_row = current[r] if r < len(current) else []
+        width = max(len(new_row), len(cur_row))
+        new_row = new_row + [""] * (width - len(new_row))
+        cur_row = cur_row + [""] * (width - len(cur_row))
+
+        # group runs of changed cells in this row into one range each
+        c = 0
+        while c < width:
+            if _cell_key(new_row[c]) == _cell_key(cur_row[c]):
+                skipped += 1
+                c += 1
+                continue
+            run_start = c
+            while c < width and _cell_key(new_row[c]) != _cell_key(cur_row[c]):
+                c += 1
+            first = pygsheets.Address((start.row + r, start.col + run_start)).label
+            last = pygsheets.Address((start.row + r, start.col + c - 1)).label
+            ranges.append(f"{first}:{last}")
+            values.append([new_row[run_start:c]])
+            written += c - run_start
+
+    if ranges:
+        sheet.update_values_batch(ranges, values, parse=True)
+    print(f"{sheet.title}: wrote {written} cells, skipped {skipped} unchanged")
+    return written, skipped
 
 
 class GoogleTools:
     def __init__(self):
-        # If modifying these scopes, delete the file token.json
-        self.scopes = [
-            "https://www.googleapis.com/auth/calendar.events",
-            "https://www.googleapis.com/auth/gmail.readonly",
-        ]
-        self.creds = None
-
-        self.get_token()
-        self.gmail = build("gmail", "v1", credentials=self.creds)
-        self.gcal = build("calendar", "v3", credentials=self.creds)
-
-        # # If modifying these scopes, delete the file token.json.
-        # SCOPES = ["https://www.googleapis.com/auth/calendar.events", "https://www.googleapis.com/auth/gmail.readonly"]
-        # creds = None
-        #
-        # creds_file = CREDENTIALS_DIR.joinpath("google_token.json")
-        # if creds_file.exists():
-        #     creds = Credentials.from_authorized_user_file(creds_file, SCOPES)
-        # # If there are no (valid) credentials available, let the user log in.
-        # if not creds or not creds.valid:
-        #     if creds and creds.expired and creds.refresh_token:
-        #         creds.refresh(Request())
-        #     else:
-        #         flow = InstalledAppFlow.from_client_secrets_file(f"{CREDENTIALS_DIR}/credentials.json", SCOPES)
-        #         creds = flow.run_local_server(port=0)
-        #
-        #     # Save the credentials for the next run
-        #     with open(f"{CREDENTIALS_DIR}/google_token.json", "w") as token:
-        #         token.write(creds.to_json())
-        #
-        # try:
-        #     self.service = build("calendar", "v3", credentials=creds)
-        #
-        # except HttpError as error:
-        #     print("An error occurred: %s" % error)
-
-    def get_token(self):
-        creds_file = CREDENTIALS_DIR.joinpath("google_token.json")
-
-        if creds_file.exists():
-            self.creds = Credentials.from_authorized_user_file(creds_file, self.scopes)
-
-        if not self.creds or not self.creds.valid:
-            if self.creds and self.creds.expired and self.creds.refresh_token:
-                self.creds.refresh(Request())
-            else:
-                flow = InstalledAppFlow.from_client_secrets_file(f"{CREDENTIALS_DIR}/credentials.json", self.scopes)
-                self.creds = flow.run_local_server(port=0)
+        self.store = EventStore(CALENDAR_STORE, CALENDAR_TZ)
 
-            with open(creds_file, "w") as token:
-                token.write(self.creds.to_json())
+    # clients are built on first use and once per process, see clients.py
+    @property
+    def creds(self):
+        return google_credentials()
 
-    def get_mail_by_label(self, label: str, start_date: str = "", end_date: str = "") -> dict:
+    @property
+    def gmail(self):
+        return google_service("gmail", "v1")
+
+    @property
+    def gcal(self):
+        return google_service("calendar", "v3")
+
+    def get_mail_by_label(self, label: str, start_date: str = "", end_date: str = "") -> list[dict]:
+        """Return id/threadId stubs for every message with the label, following nextPageToken."""
         if not end_date:
             end_date = date.today().strftime("%Y/%m/%d")
         query = f"before: {end_date}"
         if start_date:
             query += f" after: {start_date}"
 
-        return self.gmail.users().messages().list(userId="me", labelIds=[label], q=query).execute()
+        messages, page_token = [], None
+        while True:
+            results = (
+                self.gmail.users()
+                .messages()
+                .list(userId="me", labelIds=[label], q=query, maxResults=500, pageToken=page_token)
+                .execute()
+            )
+            messages.extend(results.get("messages", []))
+            page_token = results.get("nextPageToken")
+            if not page_token:
+                return messages
+
+    def get_history_id(self) -> str:
+        """Current mailbox historyId, used as the checkpoint for get_mail_history."""
+        return self.gmail.users().getProfile(userId="me").execute()["historyId"]
+
+    def get_mail_history(self, label: str, start_history_id: str) -> tuple[list[str], str] | None:
+        """Return (message IDs, new historyId) for messages added to, or labeled with, label since
+        start_history_id. Returns None if start_history_id is too old and a full listing is needed.
+        """
+        from googleapiclient.errors import HttpError
+
+        mail_ids, page_token = {}, None
+        while True:
+            try:
+                results = (
+                    self.gmail.users()
+                    .history()
+                    .list(
+                        userId="me",
+                        startHistoryId=start_history_id,
+                        labelId=label,
+                        historyTypes=["messageAdded", "labelAdded"],
+                        pageToken=page_token,
+                    )
+                    .execute()
+                )
+            except HttpError as err:
+                if err.resp.status == 404:  # history is only kept for about a week
+                    return None
+                raise
+
+            for record in results.get("history", []):
+                for change in record.get("messagesAdded", []) + record.get("labelsAdded", []):
+                    if label in change["message"].get("labelIds", []):
+                        mail_ids[change["message"]["id"]] = None  # dict to dedupe and keep order
+
+            page_token = results.get("nextPageToken")
+            if not page_token:
+                return list(mail_ids), results["historyId"]
 
     def get_mail_by_id(self, mail_id: str):
         return self.gmail.users().messages().get(userId="me", id=mail_id).execute()
 
+    def get_mail_batch(
+        self,
+        mail_ids: list[str],
+        fields: str = GMAIL_MESSAGE_FIELDS,
+        retries: int = 3,
+        gone: list[str] | None = None,
+    ) -> list[dict]:
+        """Return messages for the given IDs, in order, using Gmail HTTP batch requests.
+
+        Only the partial 'fields' response is requested. Calls that fail inside a batch with a 429 or 5xx are
+        retried in a later batch with backoff, and skipped after 'retries' attempts. Other errors, i.e. a 404
+        for a deleted message, won't succeed on a retry: those IDs are reported once and added to 'gone'.
+        """
+        messages = {}
+        pending = list(mail_ids)
+        for attempt in range(retries):
+            failed = []
+
+            def collect(request_id, response, exception):
+                if exception is None:
+                    messages[request_id] = response
+                elif getattr(getattr(exception, "resp", None), "status", None) in GMAIL_RETRY_STATUS:
+                    failed.append(request_id)
+                else:
+                    print(f"Unable to retrieve message {request_id}: {exception}")
+                    if gone is not None:
+                        gone.append(request_id)
+
+            for chunk in chunked(pending, GMAIL_BATCH_SIZE):
+                batch = self.gmail.new_batch_http_request(callback=collect)
+                for mail_id in chunk:
+                    batch.add(
+                        self.gmail.users().messages().get(userId="me", id=mail_id, fields=fields), request_id=mail_id
+                    )
+                batch.execute()
+
+            if not failed:
+                break
+            pending = failed
+            time.sleep(2**attempt)
+        else:
+            print(f"Unable to retrieve {len(pending)} messages: {', '.join(pending)}")
+
+        return [messages[i] for i in mail_ids if i in messages]
+
+    def iter_calendar_pages(self, cal_url: str, **params) -> Iterator[dict]:
+        """Yield every events().list response page, following nextPageToken.
+        The last page carries nextSyncToken.
+        """
+        page_token = None
+        while True:
+            page = (
+                self.gcal.events()
+                .list(
+                    calendarId=cal_url,
+                    singleEvents=True,
+                    maxResults=CALENDAR_PAGE_SIZE,
+                    fields=CALENDAR_EVENT_FIELDS,
+                    pageToken=page_token,
+                    **params,
+                )
+                .execute()
+            )
+            yield page
+            page_token = page.get("nextPageToken")
+            if not page_token:
+                return
+
+    def sync_calendar(self, cal_url: str) -> None:
+        """Pull events changed since the last sync into the local store.
+
+        Without a sync token, or if the token has expired (410 Gone), the store is reset and
+        the last CALENDAR_SYNC_DAYS of events are pulled in full.
+        """
+        from googleapiclient.errors import HttpError
+
+        if token := self.store.sync_token(cal_url):
+            try:
+                self._apply_pages(cal_url, self.iter_calendar_pages(cal_url, syncToken=token))
+                return
+            except HttpError as err:
+                if err.resp.status != 410:  # expired token, fall through to a full sync
+                    raise
+
+        self.store.reset(cal_url)
+        time_min = (datetime.utcnow() - timedelta(days=CALENDAR_SYNC_DAYS)).isoformat() + "Z"
+        self._apply_pages(cal_url, self.iter_calendar_pages(cal_url, timeMin=time_min))
+
+    def _apply_pages(self, cal_url: str, pages: Iterator[dict]) -> None:
+        stored = deleted = 0
+        for page in pages:
+            added, removed = self.store.apply(cal_url, page.get("items", []))
+            stored, deleted = stored + added, deleted + removed
+        # only saved once every page is applied, an interrupted sync is simply repeated
+        self.store.save_token(cal_url, page["nextSyncToken"])
+        print(f"{cal_url}: synced {stored} events, removed {deleted}")
+
     def get_engrv(self, engrv_url: str) -> list:
         """Get engineer on EngRv, to be run each Monday"""
-        now = (datetime.utcnow() - timedelta(days=2)).isoformat() + "Z"
-        d1 = (datetime.utcnow() + timedelta(weeks=4)).isoformat() + "Z"
-        engrv_rotation = (
-            self.gcal.events()
-            .list(
-                calendarId=engrv_url,
-                q="EngRv",
-                singleEvents=True,
-                orderBy="startTime",
-                timeMin=now,
-                timeMax=d1,
-            )
-            .execute()
-        )
+        self.sync_calendar(engrv_url)
+        now = datetime.now(tz=timezone.utc)
+        engrv_rotation = self.store.events(engrv_url, now - timedelta(days=2), now + timedelta(weeks=4), q="EngRv")
 
         # filter out for just the names from the gcal entry
-        return [i["summary"].split(" ")[0] for i in engrv_rotation["items"]]
+        return [i["summary"].split(" ")[0] for i in engrv_rotation]
 
     def return_calendar(self, date1: str, date2: str, cal_url: str) -> pd.DataFrame:
-        """Returns DF of events from specified calendar."""
-        events = (
-            self.gcal.events()
-            .list(
-                calendarId=cal_url,
-                timeMin=date1,
-                timeMax=date2,
-                singleEvents=True,
-                orderBy="startTime",
-            )
-            .execute()
-        ).get("items", [])
-        return pd.json_normalize(events)[
-            [
-                "summary",
-                "creator.email",
-                "description",
-                "start.dateTime",
-                "end.dateTime",
-            ]
-        ]
+        """Returns DF of events from specified calendar between two RFC3339 timestamps.
+        The local store is synced first, so only changes are downloaded.
+        """
+        self.sync_calendar(cal_url)
+        events = self.store.events(cal_url, parse_rfc3339(date1), parse_rfc3339(date2))
+        return pd.json_normalize(events).reindex(columns=EVENT_COLUMNS)
 
-    def weekly_events(self, maint_cal_url: str, internal_cal_url: str):
+    def weekly_events(self, maint_cal_url: str, internal_cal_url: str, jira: "JiraTools | None" = None):
         """Push DF of the previous week's maintenance and Internal Calendar events.
 
         Args:
             maint_cal_url (str): URL of Maintenance Calendar
             internal_cal_url (str): URL of Internal Change Calendar
+            jira (JiraTools): existing Jira session to reuse, a new one is created if not given
         """
         now = datetime.utcnow().isoformat() + "Z"  # 'Z' indicates UTC time
         d1 = (datetime.utcnow() - timedelta(days=7)).isoformat() + "Z"
 
         # return maintenance calendar events and create DF
         maint_events_df = self.return_calendar(d1, now, maint_cal_url)
-        maint_events_df = maint_events_df[
-            maint_events_df["summary"].str.contains("CENIC")
-        ]  # filter only CENIC Maintenance
-        maint_events_df["calendar"] = "Maint. Cal"
+        maint_events_df = maint_events_df[maint_events_df["summary"].str.contains("CENIC", na=False)].assign(
+            calendar="Maint. Cal"
+        )  # filter only CENIC Maintenance
 
         # return internal calendar events and create df
-        internal_cal_df = self.return_calendar(d1, now, internal_cal_url)
-        internal_cal_df["calendar"] = "Internal Cal"
-
-        # combine dfs and normalize
-        df = pd.concat([maint_events_df, internal_cal_df])
-        df["creator"] = df["creator.email"].apply(lambda x: x.replace("@cenic.org", ""))
-
-        df["end.dateTime"] = df["end.dateTime"].apply(
-            lambda x: x[11:-6] if pd.notnull(x) else ""
-        )  # trim to hours/minutes only
-
-        df[["start_date", "start_time"]] = df["start.dateTime"].str.split("T", expand=True)
-
-        df["start_time"] = df["start_time"].apply(
-            lambda x: x[:-6] if pd.notnull(x) else ""
-        )  # extract hours/minutes only
-
-        df["summary"] = df["summary"].apply(
-            lambda x: "NOC-" + x if x[0].isdigit() else x
-        )  # Add NOC- if starts with ticket number only
-
-        df["ticket"] = df["summary"].str.extract(
-            r"((?:NOC|COR|SYS|ISO)-[0-9]{3,7})", expand=True
-        )  # extract ticket from summary for creating link
+        internal_cal_df = self.return_calendar(d1, now, internal_cal_url).assign(calendar="Internal Cal")
 
-        # Add columns from related Jira ticket
-        ticket_lists = JiraTools().events_jira_outputs(list(df["ticket"]))
-        df["assignee"] = ticket_lists[0]
-        df["reporter"] = ticket_lists[1]
-        df["ticket_sum"] = ticket_lists[2]
-        df["last_comment"] = ticket_lists[3]
-
-        df["ticket"] = df["ticket"].apply(lambda x: f'=HYPERLINK("https://servicedesk.cenic.org/browse/{x}", "{x}")')
-
-        df = df[
-            [
-                "ticket",
-                "creator",
-                "assignee",
-                "reporter",
-                "ticket_sum",
-                "summary",
-                "calendar",
-                "start_date",
-                "start_time",
-                "end.dateTime",
-                "description",
-                "last_comment",
-            ]
-        ]
+        # Add columns from related Jira ticket, events without a ticket are left blank
+        events = shape_events(pd.concat([maint_events_df, internal_cal_df]))
+        df = events_report(events, (jira or JiraTools()).events_jira_outputs(events["ticket"].dropna()))
 
         tickets_sheet = open_gsheet(
             "Calendar Checks",
@@ -246,19 +490,20 @@ class GoogleTools:
 
 
 class AtlassianBase:
-    def __init__(self):
-        self.cas_user = keyring.get_password("cas", "user")
-        self.cas_pass = keyring.get_password("cas", self.cas_user)
-        self.confl_url = keyring.get_password("confluence", "url")
+    # credentials and clients are looked up on first use, see clients.py
+    @property
+    def cas_user(self) -> str:
+        return atlassian_credentials()[0]
 
-        self.jira_url = keyring.get_password("jira", "url")
-        # self.jira_url = "https://servicedesk-stage.cenic.org/"
+    @property
+    def cas_pass(self) -> str:
+        return atlassian_credentials()[1]
 
 
 class ConflTools(AtlassianBase):
-    def __init__(self):
-        super().__init__()
-        self.confl = Confluence(url=self.confl_url, username=self.cas_user, password=self.cas_pass)
+    @property
+    def confl(self):
+        return confluence_client()
 
     def push_new_page(self, parent_page_id: str, page_title: str):
         """Push Wiki formatted .txt file to Confluence as a new page.
@@ -273,8 +518,11 @@ class ConflTools(AtlassianBase):
 
 class JiraTools(AtlassianBase):
     def __init__(self):
-        super().__init__()
-        self.jira = Jira(url=self.jira_url, username=self.cas_user, password=self.cas_pass)
+        self.cache = IssueCache(JIRA_CACHE)
+
+    @property
+    def jira(self):
+        return jira_client()
 
     def cor_project_updates(self, engineer: list, jql: str) -> None:
         """Return ticket updates, creation, resolution from the COR Jira
@@ -282,9 +530,8 @@ class JiraTools(AtlassianBase):
         """
 
         ticket_updates = open_gsheet("Core Tickets", "updates")
-        ticket_updates.clear()
 
-        results = self.jira.jql(jql, limit=100, fields=["assignee", "key", "summary", "updated", "comment"])
+        issues = self.cached_jql(jql, ["assignee", "key", "summary", "updated", "comment"])
 
         columns = {
             "key": "ticket",
@@ -294,7 +541,7 @@ class JiraTools(AtlassianBase):
             "fields.comment.comments": "last_comment",
         }
 
-        df = pd.json_normalize(results["issues"]).filter(list(columns.keys()))
+        df = issues_frame(issues, list(columns.keys()))
         df.rename(
             columns,
             axis=1,
@@ -313,74 +560,175 @@ class JiraTools(AtlassianBase):
         # trim updated date to YYYY-MM-DD
         df["updated"] = df["updated"].apply(lambda x: x.split("T")[0])
 
-        ticket_updates.set_dataframe(df, start=(2, 1), extend=True, nan="")
+        sync_dataframe(ticket_updates, df, start=(2, 1))
+
+    def _fetch_by_key(
+        self,
+        keys: list[str],
+        fields: list[str],
+        jql: str = "key in ({keys})",
+        chunk_size: int = JQL_CHUNK_SIZE,
+        workers: int = JIRA_WORKERS,
+    ) -> list[dict]:
+        """Run chunked 'key in (...)' JQL on a small thread pool and return the raw issues."""
+
+        def fetch_chunk(chunk: list[str]) -> list[dict]:
+            results = self.jira.jql(
+                jql.format(keys=", ".join(chunk)),
+                limit=len(chunk),
+                fields=fields,
+                validate_query=False,  # don't fail the whole chunk on a deleted/mistyped key
+            )
+            return results["issues"]
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [submit(pool, fetch_chunk, chunk) for chunk in chunked(keys, chunk_size)]
+            return [issue for future in futures for issue in future.result()]
+
+    def _read_through(
+        self, keys: list[str], fields: list[str], cached: dict[str, tuple[float, dict]], stale: set[str], **kwargs
+    ) -> dict[str, dict]:
+        """Serve cached, non-stale issues and fetch the rest, updating the cache."""
+        issues = {key: cached[key][1] for key in cached.keys() - stale}
+        missing = [key for key in keys if key not in issues]
+        self.cache.record(hits=len(issues), misses=len(missing))
+
+        if missing:
+            fetched_at = time.time()
+            fetched = {i["key"]: i["fields"] for i in self._fetch_by_key(missing, fields, **kwargs)}
+            self.cache.put(fetched, fields, fetched_at)
+            issues.update(fetched)
+        return issues
+
+    def fetch_issues(
+        self,
+        tickets: Iterable,
+        fields: list[str],
+        chunk_size: int = JQL_CHUNK_SIZE,
+        workers: int = JIRA_WORKERS,
+    ) -> dict[str, dict]:
+        """Return {key: fields} for the given tickets.
+
+        Keys are de-duplicated and fetched with chunked 'key in (...)' JQL on a small thread pool, requesting
+        only the given fields. Non-string entries (NaN for events without a ticket) are ignored, and keys
+        that do not exist are simply missing from the output.
+
+        Reads through the issue cache, cached tickets are revalidated by fetching only their 'updated' field
+        and comparing it to when each was cached, like cached_jql. Only the ones that changed are fetched again.
+        (A JQL 'updated >=' bound would be read in the Jira user's timezone, not this host's.)
+        """
+        keys = sorted({i for i in tickets if isinstance(i, str) and i})
+        cached = self.cache.get(keys, fields)
+
+        stale = set()
+        if cached:
+            updated = self._fetch_by_key(list(cached), ["updated"], chunk_size=chunk_size, workers=workers)
+            stale = {
+                i["key"]
+                for i in updated
+                if i["key"] in cached and jira_timestamp(i["fields"]["updated"]) >= cached[i["key"]][0]
+            }
+
+        return self._read_through(keys, fields, cached, stale, chunk_size=chunk_size, workers=workers)
+
+    def iter_jql(
+        self, jql: str, fields: list[str], page_size: int = JQL_PAGE_SIZE, prefetch: bool = True
+    ) -> Iterator[dict]:
+        """Yield every issue matching the JQL, one at a time, paging lazily with startAt.
 
-    def events_jira_outputs(self, tickets_list: list):
-        """Return several output lists based on input ticket list.
+        With prefetch, the next page is requested on a background thread while the current one is consumed.
+        """
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            start = 0
+            page = self.jira.jql(jql, start=start, limit=page_size, fields=fields)
+            while page["issues"]:
+                start += len(page["issues"])
+                more = start < page["total"]
+                if more and prefetch:
+                    next_page = submit(pool, self.jira.jql, jql, start=start, limit=page_size, fields=fields)
+
+                yield from page["issues"]
+
+                if not more:
+                    break
+                if prefetch:
+                    page = next_page.result()
+                else:
+                    page = self.jira.jql(jql, start=start, limit=page_size, fields=fields)
+
+    def cached_jql(self, jql: str, fields: list[str], chunk_size: int = JQL_PAGE_SIZE) -> Iterator[dict]:
+        """Run JQL through the issue cache and yield issues in JQL order, in the same shape as jql()["issues"].
+
+        The search itself only requests 'updated', tickets that changed since they were cached (or aren't
+        cached) are fetched with the requested fields, chunk_size issues at a time.
+        """
+        for results in chunked(self.iter_jql(jql, ["updated"]), chunk_size):
+            keys = [i["key"] for i in results]
+            cached = self.cache.get(keys, fields)
+            stale = {
+                i["key"]
+                for i in results
+                if i["key"] in cached and jira_timestamp(i["fields"]["updated"]) >= cached[i["key"]][0]
+            }
+
+            issues = self._read_through(keys, fields, cached, stale)
+            yield from ({"key": key, "fields": issues[key]} for key in keys if key in issues)
+
+    def events_jira_outputs(self, tickets: Iterable) -> pd.DataFrame:
+        """Return DF of assignee, reporter, summary and last comment indexed by ticket.
         Used for adding Jira data to gCal weekly reporting.
         """
-        assignee_list, reporter_list, ticket_sum_list, comments_list = [], [], [], []
-        for ticket in tickets_list:
-            if isinstance(ticket, str):
-                # ticket will be float nan if no ticket is on event
-                output = self.jira.issue(ticket)
-                try:
-                    assignee_list.append(output["fields"]["assignee"]["name"])
-                except TypeError:
-                    assignee_list.append("Unassigned")
-                ticket_sum_list.append(output["fields"]["summary"])
-
-                try:
-                    reporter_list.append(output["fields"]["reporter"]["name"])
-                except TypeError:  # no reporter
-                    reporter_list.append("")
-
-                try:
-                    comments_list.append(output["fields"]["comment"]["comments"][-1]["body"])  # get most recent comment
-                except IndexError:  # if no comments
-                    comments_list.append("")
-            else:
-                assignee_list.append("")
-                reporter_list.append("")
-                ticket_sum_list.append("")
-                comments_list.append("")
-        return assignee_list, reporter_list, ticket_sum_list, comments_list
+        issues = self.fetch_issues(tickets, ["assignee", "reporter", "summary", "comment"])
+        records = {
+            key: {
+                "assignee": (fields["assignee"] or {}).get("name", "Unassigned"),
+                "reporter": (fields["reporter"] or {}).get("name", ""),
+                "ticket_sum": fields["summary"],
+                "last_comment": get_last_comment(fields["comment"]["comments"]),
+            }
+            for key, fields in issues.items()
+        }
+        return pd.DataFrame.from_dict(
+            records, orient="index", columns=["assignee", "reporter", "ticket_sum", "last_comment"]
+        )
 
     def core_tickets(self, engineer: list, jql_request: str):
-        """Get all open tickets for engineers"""
+        """Get all open tickets for engineers.
+
+        jql_request is formatted with '{engineers}', all engineers are pulled with a single
+        paginated 'assignee in (...)' query and the sheet keeps the usernames.yml ordering.
+        """
         tickets_sheet = open_gsheet("Core Tickets", "Bulk")
-        tickets_sheet.clear()
 
-        full_df = pd.DataFrame()
-        for i in engineer:
-            results = self.jira.jql(
-                jql_request.format(engineer=i),
-                limit=500,
-                fields=[
-                    "assignee",
-                    "key",
-                    "status",
-                    "labels",
-                    "summary",
-                    "updated",
-                    MILESTONE,
-                ],
-            )
-            df = pd.json_normalize(results["issues"]).filter(
-                [
-                    "fields.assignee.name",
-                    "fields.summary",
-                    "key",
-                    "fields.status.name",
-                    "fields.updated",
-                    f"fields.{MILESTONE}.value",
-                    "fields.labels",
-                ]
-            )
-            # trim to YYYY-MM-DD format
-            df["fields.updated"] = df["fields.updated"].apply(lambda x: x[:10])
-            full_df = pd.concat([full_df, df])
-        tickets_sheet.set_dataframe(full_df, start=(1, 1), extend=True, nan="")
+        issues = self.cached_jql(
+            jql_request.format(engineers=", ".join(engineer)),
+            [
+                "assignee",
+                "key",
+                "status",
+                "labels",
+                "summary",
+                "updated",
+                MILESTONE,
+            ],
+        )
+        df = issues_frame(
+            issues,
+            [
+                "fields.assignee.name",
+                "fields.summary",
+                "key",
+                "fields.status.name",
+                "fields.updated",
+                f"fields.{MILESTONE}.value",
+                "fields.labels",
+            ],
+        )
+        df = sort_by_engineer(df, "fields.assignee.name", engineer)
+
+        # trim to YYYY-MM-DD format
+        df["fields.updated"] = df["fields.updated"].str[:10]
+        sync_dataframe(tickets_sheet, df, start=(1, 1))
 
     def update_engrv(self, engineer_list: str, bucket_dict: dict, hours: int):
         """Update rotating buckets for EngRv. Allocation is per week, gets the upcoming month's order"""
@@ -446,64 +794,63 @@ class JiraTools(AtlassianBase):
         engineers.remove("jdickman")
         engineers.remove("sshibley")
 
-        full_df = pd.DataFrame()
-        for i in engineers:
-            results = self.jira.jql(
-                jql_request.format(engineer=i),
-                limit=50,
-                fields=[
-                    "assignee",
-                    "key",
-                    "summary",
-                    "timetracking",
-                    START_DATE,
-                    END_DATE,
-                ],
-            )
-            df = pd.json_normalize(results["issues"]).filter(
-                [
-                    "fields.assignee.name",
-                    "fields.summary",
-                    "key",
-                    "fields.timetracking.originalEstimateSeconds",
-                    f"fields.{START_DATE}",
-                    f"fields.{END_DATE}",
-                ]
-            )
-            df = df.rename(
-                columns={
-                    "fields.assignee.name": "assignee",
-                    "fields.summary": "summary",
-                }
-            )
-            df["key"] = df["key"].apply(lambda x: f'=HYPERLINK("https://servicedesk.cenic.org/browse/{x}", "{x}")')
-
-            # convert original estimate to hours
-            # get original hours / day, multiply by 5 and divide by number of business
-            # days to get hours allocated over the current week
-            org_est_list = [int(i) / 3600 for i in df["fields.timetracking.originalEstimateSeconds"]]
-            start_date_list = list(df[f"fields.{START_DATE}"])
-            end_date_list = list(df[f"fields.{END_DATE}"])
-            df["weekly_hours"] = org_est_list / np.busday_count(start_date_list, end_date_list) * 5
-            df["weekly_hours"] = df["weekly_hours"].apply(lambda x: round(x, 2))
-
-            # get previous monday as datetime string
-            today = datetime.today()
-            df["week_start"] = (today - timedelta(days=today.weekday())).strftime("%Y-%m-%d")
-
-            df = df[
-                [
-                    "assignee",
-                    "summary",
-                    "key",
-                    "weekly_hours",
-                    "week_start",
-                ]
+        issues = self.cached_jql(
+            jql_request.format(engineers=", ".join(engineers)),
+            [
+                "assignee",
+                "key",
+                "summary",
+                "timetracking",
+                START_DATE,
+                END_DATE,
+            ],
+        )
+        df = issues_frame(
+            issues,
+            [
+                "fields.assignee.name",
+                "fields.summary",
+                "key",
+                "fields.timetracking.originalEstimateSeconds",
+                f"fields.{START_DATE}",
+                f"fields.{END_DATE}",
+            ],
+        )
+        df = df.rename(
+            columns={
+                "fields.assignee.name": "assignee",
+                "fields.summary": "summary",
+            }
+        )
+        df = sort_by_engineer(df, "assignee", engineers)
+        df["key"] = '=HYPERLINK("https://servicedesk.cenic.org/browse/' + df["key"] + '", "' + df["key"] + '")'
+
+        # convert original estimate to hours
+        # get original hours / day, multiply by 5 and divide by number of business
+        # days to get hours allocated over the current week
+        org_est = df["fields.timetracking.originalEstimateSeconds"].astype(int) / 3600
+        busdays = np.busday_count(
+            df[f"fields.{START_DATE}"].to_numpy(dtype="datetime64[D]"),
+            df[f"fields.{END_DATE}"].to_numpy(dtype="datetime64[D]"),
+        )
+        df["weekly_hours"] = (org_est / busdays * 5).round(2)
+
+        # get previous monday as datetime string
+        today = datetime.today()
+        df["week_start"] = (today - timedelta(days=today.weekday())).strftime("%Y-%m-%d")
+
+        df = df[
+            [
+                "assignee",
+                "summary",
+                "key",
+                "weekly_hours",
+                "week_start",
             ]
-            full_df = pd.concat([full_df, df])
+        ]
 
         first_row = len(resources_sheet.get_col(1, include_tailing_empty=False)) + 1
-        resources_sheet.set_dataframe(full_df, start=(first_row, 1), copy_head=False, extend=True, nan="")
+        resources_sheet.set_dataframe(df, start=(first_row, 1), copy_head=False, extend=True, nan="")
 
     def get_cpe_tracker_info(self) -> None:
         """Used for the CPE Hardware Tracker, for each active deployment ticket the milestones and
@@ -514,54 +861,57 @@ class JiraTools(AtlassianBase):
           - For CPE, Modem, DF purchase tickets, adds text to indicate delivery status
         """
 
-        def get_milestone(ticket):
-            try:
-                return self.jira.issue_field_value(ticket, MILESTONE)["value"]
-            except (requests.exceptions.HTTPError, TypeError):
-                return ""
-
-        def get_delivered(ticket):
-            if ticket:
-                ticket_data = self.jira.issue(ticket)["fields"]
-                status = ticket_data["status"]["name"]
-                assignee = ticket_data["assignee"]["name"]
-                reporter = ticket_data["reporter"]["name"]
-                last_comment = ticket_data["comment"]["comments"][-1]["body"].upper()
-
-                if status == "Withdrawn":
-                    return "Withdrawn"
-                elif (assignee == reporter) or (status == "Resolved"):
-                    return "Delivered"
-                elif "PARTIAL" in last_comment:
-                    return "Partial Delivery"
-                else:
-                    return "Not Delivered"
+        def delivery_status(fields: dict) -> str:
+            status = fields["status"]["name"]
+            assignee = (fields["assignee"] or {}).get("name")
+            reporter = (fields["reporter"] or {}).get("name")
+            last_comment = get_last_comment(fields["comment"]["comments"]).upper()
+
+            if status == "Withdrawn":
+                return "Withdrawn"
+            elif (assignee and assignee == reporter) or (status == "Resolved"):
+                return "Delivered"
+            elif "PARTIAL" in last_comment:
+                return "Partial Delivery"
             else:
-                return ""
+                return "Not Delivered"
 
         active_sheet = open_gsheet("CPE Hardware Tracker", "Active")
         resolved_sheet = open_gsheet("CPE Hardware Tracker", "Resolved")
         active_df = active_sheet.get_as_df(start="A2", include_tailing_empty=False)
         resolved_df = resolved_sheet.get_as_df(include_tailing_empty=False)
 
-        # get status and trim resolved; drop unneeded Status
-        active_df["Status"] = active_df["Deployment Ticket"].apply(lambda x: self.jira.get_issue_status(x))
-        new_resolved_df = active_df[active_df["Status"] == "Resolved"]
-        active_df = active_df[active_df["Status"] != "Resolved"]
-        active_df = active_df.drop("Status", axis=1)
-        new_resolved_df = new_resolved_df.drop("Status", axis=1)
+        # resolve every deployment and purchase ticket in one batched fetch, then map results onto the columns
+        purchase_cols = [f"{col} Purchase Ticket" for col in ("CPE", "Modem", "Dark Fiber Equip.")]
+        tickets = pd.unique(active_df[["Deployment Ticket", *purchase_cols]].values.ravel())
+        issues = self.fetch_issues(tickets, ["status", "assignee", "reporter", "comment", MILESTONE])
+        lookup = pd.DataFrame.from_dict(
+            {
+                key: {
+                    "status": fields["status"]["name"],
+                    "milestone": (fields.get(MILESTONE) or {}).get("value", ""),  # not on every project
+                    "delivered": delivery_status(fields),
+                }
+                for key, fields in issues.items()
+            },
+            orient="index",
+            columns=["status", "milestone", "delivered"],
+        )
+
+        # trim resolved
+        status = active_df["Deployment Ticket"].map(lookup["status"])
+        new_resolved_df = active_df[status == "Resolved"]
+        active_df = active_df[status != "Resolved"].copy()
 
         # Get Milestones and hardware delivery data
-        active_df["Ticket Milestone"] = active_df["Deployment Ticket"].apply(lambda x: get_milestone(x))
+        active_df["Ticket Milestone"] = active_df["Deployment Ticket"].map(lookup["milestone"]).fillna("")
         for col in ("CPE", "Modem", "Dark Fiber Equip."):
-            active_df[f"{col} Delivered"] = active_df[f"{col} Purchase Ticket"].apply(lambda x: get_delivered(x))
+            active_df[f"{col} Delivered"] = active_df[f"{col} Purchase Ticket"].map(lookup["delivered"]).fillna("")
 
         # combine resolved DFs
         resolved_df = pd.concat([resolved_df, new_resolved_df])
-        active_sheet.clear(start="A3")
-        resolved_sheet.clear(start="A2")
-        active_sheet.set_dataframe(active_df, start="A3", copy_head=False, extend=True, nan="")
-        resolved_sheet.set_dataframe(resolved_df, start="A2", copy_head=False, extend=True, nan="")
+        sync_dataframe(active_sheet, active_df, start="A3", copy_head=False)
+        sync_dataframe(resolved_sheet, resolved_df, start="A2", copy_head=False)
 
     def purchases_tracking(self, core: list) -> None:
         """Update Purchase Tracker, run each week.
@@ -611,10 +961,9 @@ class JiraTools(AtlassianBase):
             and reporter in ({", ".join(map(str, core))})
         """
 
-        results = self.jira.jql(
+        issues = self.cached_jql(
             re.sub(r"\s+", " ", jql),
-            limit=200,
-            fields=[
+            [
                 "assignee",
                 "reporter",
                 "key",
@@ -626,7 +975,8 @@ class JiraTools(AtlassianBase):
             ],
         )
 
-        df = pd.json_normalize(results["issues"]).filter(
+        df = issues_frame(
+            issues,
             [
                 "fields.assignee.name",
                 "fields.reporter.name",
@@ -636,7 +986,7 @@ class JiraTools(AtlassianBase):
                 f"fields.{JUSTIFICATION}",
                 f"fields.{SEGMENT}.value",
                 "fields.comment.comments",
-            ]
+            ],
         )
         df.rename(
             columns={
@@ -674,18 +1024,16 @@ class JiraTools(AtlassianBase):
         ]
 
         data_sheet = open_gsheet("Core Purchase Tracking", "data")
-        data_sheet.clear(start="A8")
-        data_sheet.set_dataframe(df, start=(8, 1), extend=True, nan="")
+        sync_dataframe(data_sheet, df, start=(8, 1))
 
         # add tickets pending manager approval
         mgr_jql = f"""project = Purchasing and status in
             ("Pending Core Approval") and reporter in ({", ".join(map(str, core))})
         """
 
-        mgr_results = self.jira.jql(
+        mgr_issues = self.cached_jql(
             re.sub(r"\s+", " ", mgr_jql),
-            limit=200,
-            fields=[
+            [
                 "key",
                 "reporter",
                 SEGMENT,
@@ -694,14 +1042,15 @@ class JiraTools(AtlassianBase):
             ],
         )
 
-        mgr_df = pd.json_normalize(mgr_results["issues"]).filter(
+        mgr_df = issues_frame(
+            mgr_issues,
             [
                 "key",
                 "fields.reporter.name",
                 f"fields.{SEGMENT}.value",
                 "fields.summary",
                 f"fields.{JUSTIFICATION}",
-            ]
+            ],
         )
 
         mgr_df.rename(
@@ -716,39 +1065,47 @@ class JiraTools(AtlassianBase):
         )
 
         data_sheet = open_gsheet("Core Purchase Tracking", "mgr_approval")
-        data_sheet.clear()
-        data_sheet.set_dataframe(mgr_df, start=(1, 1), extend=True, nan="")
+        sync_dataframe(data_sheet, mgr_df, start=(1, 1))
 
     def la2_migration_status(self):
+        """Refresh assignee, status, end date and last comment (columns H-M) for every ticket in the tracker.
+
+        All tickets are pulled with fetch_issues and the sheet is written with a single ranged update.
+        Rows without a valid ticket are sent as nulls, which the Sheets API leaves untouched.
+        """
         tickets_sheet = open_gsheet("LA2 Migration - Deployment Tracker", "Sheet1")
-        tickets_list = tickets_sheet.get_col(1, include_tailing_empty=False, returnas="cell")
-        tickets_list.pop(0)  # remove header
+        tickets_list = tickets_sheet.get_col(1, include_tailing_empty=False)[1:]  # remove header
+        issues = self.fetch_issues(tickets_list, ["assignee", "status", "comment", END_DATE])
 
+        update_vals = []
         for ticket in tickets_list:
-            ticket_data = self.jira.issue(ticket.value)["fields"]
-
-            comments = ticket_data["comment"]["comments"]
-            if len(comments) > 0:
-                for i, comment in enumerate(comments):
-                    if "moved via" in comment["body"]:
-                        comments.pop(i)
-
-            if len(comments) > 0:  # if still comments after removing BP updates
-                last_comment = comments[-1:][0]["body"]
-                updated = comments[-1:][0]["updated"].split("T")[0]
-                author = comments[-1:][0]["author"]["displayName"]
+            ticket_data = issues.get(ticket)
+            if not ticket_data:
+                update_vals.append([None] * 6)
+                continue
+
+            # ignore BP updates, i.e. 'Task COR-XXXX moved via...'
+            comments = [i for i in ticket_data["comment"]["comments"] if "moved via" not in i["body"]]
+            if comments:
+                last_comment = comments[-1]["body"]
+                updated = comments[-1]["updated"].split("T")[0]
+                author = comments[-1]["author"]["displayName"]
             else:
                 last_comment, updated, author = "", "", ""
 
-            update_vals = [
-                ticket_data["assignee"]["displayName"],
-                ticket_data["status"]["name"],
-                ticket_data[END_DATE],
-                last_comment,
-                updated,
-                author,
-            ]
-            tickets_sheet.update_row(ticket.row, update_vals, col_offset=7)
+            update_vals.append(
+                [
+                    (ticket_data["assignee"] or {}).get("displayName", ""),
+                    ticket_data["status"]["name"],
+                    ticket_data[END_DATE],
+                    last_comment,
+                    updated,
+                    author,
+                ]
+            )
+
+        if update_vals:
+            tickets_sheet.update_values(crange=f"H2:M{len(update_vals) + 1}", values=update_vals)
 
     def get_ticket_summary(self, ticket: str) -> str:
         return self.jira.get_issue(ticket, fields=["summary"])["fields"]["summary"]